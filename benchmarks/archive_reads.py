@@ -0,0 +1,92 @@
+"""
+Loading a month of metrics for analysis through DataStore (SQLite -> pandas) against the
+memory-mapped column archive of the same partition (history_archive.HistoryArchive).
+
+Each archive call opens a fresh HistoryArchive, so manifest reading and mapping are included.
+Peak memory is what tracemalloc sees allocated during the call; pages of the mapped column
+files are shared with the OS page cache and not counted.
+
+    python -m benchmarks.archive_reads --rows-per-day 20000 --output bench_archive.json
+    python -m benchmarks.archive_reads --compare bench_archive.json
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.datastore_queries import generate_legacy_db
+from benchmarks.stats import print_comparison, summarize, write_report
+from history_archive import HistoryArchive, archive_closed_partitions
+from shared_data import DataStore
+
+
+def measure(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = summarize(samples)
+    stats['peak_kib'] = round(peak / 1024, 1)
+    return stats
+
+
+def month_reads(store, archive_dir, first_day, last_day):
+    end = str(np.datetime64(last_day) + 1)
+
+    def sqlite_daily():
+        df = store.get_selected_data(first_day, last_day, 'seg_belt')
+        return df.groupby(df['time_stamp'].str[:10])['speed'].agg(['count', 'mean', 'min', 'max'])
+
+    return {
+        'sqlite_month': lambda: store.get_selected_data(first_day, last_day, 'seg_belt'),
+        'archive_month': lambda: {column: np.asarray(values) for column, values in HistoryArchive(archive_dir).scan(
+            'storeHouse', first_day, end, key='seg_belt').items()},
+        'sqlite_daily': sqlite_daily,
+        'archive_daily': lambda: HistoryArchive(archive_dir).aggregate('storeHouse', 'speed', 'Day', first_day, end,
+                                                                       key='seg_belt'),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Column archive read benchmark')
+    parser.add_argument('--rows-per-day', type=int, default=20000, help='storeHouse rows per day [20000]')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed calls per read [5]')
+    parser.add_argument('--output', default='bench_archive.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    report = {'params': {'rows_per_day': args.rows_per_day, 'repeats': args.repeats}, 'reads': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'legacy.db')
+        generate_legacy_db(legacy, args.rows_per_day * 70, 70)
+        store = DataStore(db_path=os.path.join(tmp, 'history.db'), partition='month')
+        store.import_history(legacy)
+        archive_dir = os.path.join(tmp, 'archive')
+        start = time.perf_counter()
+        archived = archive_closed_partitions(store.db_path, archive_dir)
+        archive_s = time.perf_counter() - start
+
+        # The newest complete month
+        manifest = HistoryArchive(archive_dir).manifest['partitions']
+        name = max(name for name in archived if manifest[name]['first_day'][8:] == '01')
+        first_day, last_day = manifest[name]['first_day'], manifest[name]['last_day']
+        print(f"Archived {len(archived)} partitions in {archive_s:.2f}s, reading {name}\n")
+
+        print(f"{'read':<16}{'p50 ms':>12}{'peak KiB':>12}")
+        for read, fn in month_reads(store, archive_dir, first_day, last_day).items():
+            stats = measure(fn, args.repeats)
+            report['reads'][read] = stats
+            print(f"{read:<16}{stats['p50_ms']:>12.3f}{stats['peak_kib']:>12.1f}")
+        report['archive_s'] = round(archive_s, 3)
+        store.close()
+
+    if args.compare:
+        print_comparison(args.compare, report, section='reads', key='p50_ms')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,177 @@
+"""
+Synthetic conveyor scenes for measuring the SORT tracker offline, without MOT2015 data.
+
+Objects enter at the top of the frame and ride the belt down at a fixed speed. Detections get
+position jitter and are randomly dropped. Each scene can be written as a MOT-style sequence
+(det/det.txt plus gt/gt.txt) that `python sort.py --seq_path DIR` reads as-is. The benchmark mode
+reports tracker FPS, ID switches and peak memory over a grid of settings.
+
+    python -m benchmarks.conveyor_tracks --objects 10 50 --speeds 4 12 --dropout 0 0.2 --jitter 1 3
+    python -m benchmarks.conveyor_tracks --belt-prior --detect-every 3 --compare bench_conveyor.json
+    python -m benchmarks.conveyor_tracks --write synthetic   # then: python sort.py --seq_path synthetic
+"""
+import argparse
+import itertools
+import os
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.stats import print_comparison, summarize, write_report
+from sort import Sort, iou_batch, linear_assignment
+
+MOT_FORMAT = '%d,%d,%.2f,%.2f,%.2f,%.2f,%.2f,-1,-1,-1'
+
+
+def generate_scene(objects, speed, dropout, jitter, frames=300, width=900, height=720, size=(25, 60), seed=0):
+    """
+    Returns (dets, gt) as MOT rows [frame, id, x, y, w, h, conf, -1, -1, -1], frames numbered from 1.
+    objects is the average number on the belt at once, speed is in pixels per frame, dropout the
+    chance a detection is missed and jitter the standard deviation of the detection noise in pixels.
+    """
+    rng = np.random.default_rng(seed)
+    spawn_rate = objects * speed / height  # arrivals per frame that keep `objects` on the belt
+    # Start with the belt already loaded
+    start = int(np.ceil(height / speed))
+    live = np.zeros((0, 5))  # id, x, y, w, h
+    next_id = 1
+    dets, gt = [], []
+    for frame in range(-start, frames + 1):
+        arrivals = rng.poisson(spawn_rate)
+        if arrivals:
+            wh = rng.uniform(size[0], size[1], (arrivals, 2))
+            x = rng.uniform(0, width - wh[:, 0])
+            new = np.column_stack([np.arange(next_id, next_id + arrivals), x, -wh[:, 1], wh])
+            next_id += arrivals
+            live = np.concatenate([live, new])
+        live[:, 2] += speed
+        live = live[live[:, 2] < height]
+        if frame < 1:
+            continue
+
+        visible = live[live[:, 2] + live[:, 4] > 0]
+        n = len(visible)
+        ones = np.ones(n)
+        gt.append(np.column_stack([frame * ones, visible[:, 0], visible[:, 1:5], ones, -ones, -ones, -ones]))
+        seen = visible[rng.random(n) >= dropout]
+        m = len(seen)
+        boxes = seen[:, 1:5] + rng.normal(0, jitter, (m, 4)) if jitter else seen[:, 1:5]
+        dets.append(np.column_stack([frame * np.ones(m), -np.ones(m), boxes, rng.uniform(0.5, 1.0, m),
+                                     -np.ones((m, 3))]))
+    return np.concatenate(dets), np.concatenate(gt)
+
+
+def write_sequence(seq_dir, dets, gt):
+    """Writes det/det.txt and gt/gt.txt under seq_dir in the MOT format sort.py reads"""
+    for name, rows in (('det', dets), ('gt', gt)):
+        os.makedirs(os.path.join(seq_dir, name), exist_ok=True)
+        np.savetxt(os.path.join(seq_dir, name, f'{name}.txt'), rows[:, :7], fmt=MOT_FORMAT)
+
+
+def track_scene(dets, belt_velocity=None, detect_every=1):
+    """Runs Sort over MOT detection rows; returns ({frame: (N, 5) tracks}, per-frame durations)"""
+    tracker = Sort(max_age=20, min_hits=3, iou_threshold=0.3)
+    if belt_velocity is not None:
+        tracker.set_belt_velocity(belt_velocity)
+    frame_ids = dets[:, 0].astype(int)
+    order = np.argsort(frame_ids, kind='stable')
+    bounds = np.searchsorted(frame_ids[order], np.arange(1, frame_ids.max() + 2))
+    tracks, samples = {}, []
+    for frame in range(1, frame_ids.max() + 1):
+        rows = dets[order[bounds[frame - 1]:bounds[frame]]]
+        boxes = np.column_stack([rows[:, 2:4], rows[:, 2:4] + rows[:, 4:6], rows[:, 6]])
+        start = time.perf_counter()
+        if (frame - 1) % detect_every:
+            tracks[frame] = tracker.coast()
+        else:
+            tracks[frame] = tracker.update(boxes)
+        samples.append(time.perf_counter() - start)
+    return tracks, samples
+
+
+def count_id_switches(gt, tracks, min_iou=0.5):
+    """
+    CLEAR-MOT style ID switches: a ground-truth object matched to a different track id than the
+    last time it was matched. Also returns how many distinct track ids were matched to objects.
+    """
+    last_match = {}
+    used_ids = set()
+    switches = 0
+    for frame, out in tracks.items():
+        truth = gt[gt[:, 0] == frame]
+        if len(truth) == 0 or len(out) == 0:
+            continue
+        gt_boxes = np.column_stack([truth[:, 2:4], truth[:, 2:4] + truth[:, 4:6]])
+        iou = iou_batch(gt_boxes, out[:, :4])
+        for g, t in linear_assignment(-iou).reshape(-1, 2).astype(int):
+            if iou[g, t] < min_iou:
+                continue
+            obj_id, track_id = int(truth[g, 1]), int(out[t, 4])
+            if last_match.get(obj_id, track_id) != track_id:
+                switches += 1
+            last_match[obj_id] = track_id
+            used_ids.add(track_id)
+    return switches, len(used_ids), len(last_match)
+
+
+def run_scene(objects, speed, dropout, jitter, frames, belt_prior, detect_every):
+    dets, gt = generate_scene(objects, speed, dropout, jitter, frames)
+    velocity = (0.0, speed) if belt_prior else None
+    tracks, samples = track_scene(dets, velocity, detect_every)
+    switches, track_ids, matched_objects = count_id_switches(gt, tracks)
+
+    # Memory is measured on a second pass so tracemalloc doesn't skew the timings
+    tracemalloc.start()
+    track_scene(dets, velocity, detect_every)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = summarize(samples)
+    stats.update({
+        'fps': round(len(samples) / sum(samples), 1),
+        'id_switches': switches,
+        'objects': int(len(np.unique(gt[:, 1]))),
+        'matched_objects': matched_objects,
+        'track_ids': track_ids,
+        'peak_kib': round(peak / 1024, 1),
+    })
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic conveyor tracker benchmark')
+    parser.add_argument('--objects', type=int, nargs='+', default=[10, 50], help='Objects on the belt at once')
+    parser.add_argument('--speeds', type=float, nargs='+', default=[4, 12], help='Belt speeds in px/frame')
+    parser.add_argument('--dropout', type=float, nargs='+', default=[0.0, 0.2], help='Missed detection rates')
+    parser.add_argument('--jitter', type=float, nargs='+', default=[1.0, 3.0], help='Detection noise in px')
+    parser.add_argument('--frames', type=int, default=300, help='Frames per scene [300]')
+    parser.add_argument('--belt-prior', action='store_true', help='Give Sort the belt velocity as a motion prior')
+    parser.add_argument('--detect-every', type=int, default=1, help='Detections every Nth frame, coast between [1]')
+    parser.add_argument('--write', default=None, help='Write the scenes as MOT sequences under DIR/train instead')
+    parser.add_argument('--output', default='bench_conveyor.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    grid = list(itertools.product(args.objects, args.speeds, args.dropout, args.jitter))
+    if args.write:
+        for objects, speed, dropout, jitter in grid:
+            name = f'conveyor-o{objects}-s{speed:g}-d{dropout:g}-j{jitter:g}'
+            write_sequence(os.path.join(args.write, 'train', name), *generate_scene(objects, speed, dropout, jitter,
+                                                                                  args.frames))
+            print(f"Wrote {name}")
+        raise SystemExit(0)
+
+    report = {'params': {'frames': args.frames, 'belt_prior': args.belt_prior, 'detect_every': args.detect_every},
+              'scenes': {}}
+    print(f"{'scene':<28}{'fps':>9}{'p99 ms':>9}{'id sw':>7}{'objects':>9}{'ids':>7}{'peak KiB':>10}")
+    for objects, speed, dropout, jitter in grid:
+        name = f'o{objects} s{speed:g} d{dropout:g} j{jitter:g}'
+        stats = run_scene(objects, speed, dropout, jitter, args.frames, args.belt_prior, args.detect_every)
+        report['scenes'][name] = stats
+        print(f"{name:<28}{stats['fps']:>9.1f}{stats['p99_ms']:>9.3f}{stats['id_switches']:>7}"
+              f"{stats['objects']:>9}{stats['track_ids']:>7}{stats['peak_kib']:>10.1f}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='scenes', key='fps')
+        print_comparison(args.compare, report, section='scenes', key='id_switches')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
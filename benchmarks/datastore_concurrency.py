@@ -0,0 +1,112 @@
+"""
+Ingest throughput of the buffered DataStore writer while dashboard clients query the same
+database, and the latency those clients see, for growing numbers of clients.
+
+As in production, the readers live in a separate dashboard process with its own DataStore, one
+thread per client, each running one refresh per interval (the dashboard's dcc.Interval): a live
+tail (get_rows_since), the last speed, hourly averages and today's rows for a belt. Ingest rows/s
+covers add_data calls up to the final flush, on top of a history of generated rows. Refresh
+latency includes any wait for another client or the writer.
+
+    python -m benchmarks.datastore_concurrency --readers 0 4 8 --output bench_concurrency.json
+    python -m benchmarks.datastore_concurrency --compare bench_concurrency.json
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from benchmarks.datastore_queries import generate_legacy_db
+from benchmarks.stats import print_comparison, summarize, write_report
+from shared_data import DataStore
+
+
+def dashboard_refresh(store, cursor):
+    today = datetime.date.today().isoformat()
+    rows = store.get_rows_since('seg_belt', cursor)
+    store.get_last_row('seg_belt')
+    store.group_by_data('Hour', 'seg_belt')
+    store.get_selected_data(today, today, 'seg_belt')
+    return int(rows['id'][-1]) if len(rows['id']) else cursor
+
+
+def reader_loop(store, stop, samples, interval):
+    cursor = store.last_row_id()
+    while not stop.is_set():
+        start = time.perf_counter()
+        cursor = dashboard_refresh(store, cursor)
+        samples.append(time.perf_counter() - start)
+        stop.wait(max(0.0, interval - samples[-1]))
+
+
+def dashboard_process(db_path, readers, interval, ready, stop, results):
+    store = DataStore(make_table=False, db_path=db_path)
+    done = threading.Event()
+    samples = [[] for _ in range(readers)]
+    threads = [threading.Thread(target=reader_loop, args=(store, done, samples[i], interval)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    ready.set()
+    stop.wait()
+    done.set()
+    for thread in threads:
+        thread.join()
+    store.close()
+    results.put([sample for thread_samples in samples for sample in thread_samples])
+
+
+def run_readers(db_path, readers, rows, interval):
+    store = DataStore(db_path=db_path)
+    ready, stop, results = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Queue()
+    dashboard = multiprocessing.Process(target=dashboard_process,
+                                        args=(db_path, readers, interval, ready, stop, results))
+    dashboard.start()
+    ready.wait()
+
+    start = time.perf_counter()
+    for i in range(rows):
+        store.add_data(100 + i % 200, i % 7, (i * 13) % 100, 'seg_belt' if i % 2 else 'pickup_belt')
+        if i % 100 == 99:
+            time.sleep(0)  # let the writer and readers run, as between camera frames
+    store.flush()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    refreshes = results.get()
+    dashboard.join()
+    store.close()
+    stats = summarize(refreshes) if refreshes else {'count': 0, 'p50_ms': 0.0, 'p99_ms': 0.0}
+    stats['rows_per_s'] = round(rows / elapsed, 1)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataStore ingest under concurrent readers')
+    parser.add_argument('--readers', type=int, nargs='+', default=[0, 4, 8], help='Dashboard clients per run')
+    parser.add_argument('--rows', type=int, default=20000, help='Rows ingested per run [20000]')
+    parser.add_argument('--interval-ms', type=int, default=1000, help='Refresh interval per client [1000]')
+    parser.add_argument('--history', type=int, default=200000, help='storeHouse rows generated first [200000]')
+    parser.add_argument('--output', default='bench_concurrency.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    report = {'params': {'rows': args.rows, 'interval_ms': args.interval_ms, 'history': args.history}, 'runs': {}}
+    print(f"{'run':<12}{'rows/s':>12}{'refreshes':>11}{'p50 ms':>10}{'p99 ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'legacy.db')
+        generate_legacy_db(legacy, args.history, 30)
+        for readers in args.readers:
+            db_path = os.path.join(tmp, f'readers{readers}.db')
+            shutil.copy(legacy, db_path)
+            stats = run_readers(db_path, readers, args.rows, args.interval_ms / 1000.0)
+            report['runs'][f'readers {readers}'] = stats
+            print(f"{'readers ' + str(readers):<12}{stats['rows_per_s']:>12.1f}{stats['count']:>11}"
+                  f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='runs', key='rows_per_s')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
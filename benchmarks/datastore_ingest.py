@@ -0,0 +1,71 @@
+"""
+DataStore ingest throughput and caller-side latency, committing every row in the caller
+(buffered=False, the old path) against the background writer (buffered=True).
+
+Rows/s covers everything up to close(), so the buffered figure includes draining its queue.
+
+    python -m benchmarks.datastore_ingest --rows 5000 --output bench_ingest.json
+    python -m benchmarks.datastore_ingest --compare bench_ingest.json
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from benchmarks.stats import print_comparison, summarize, write_report
+from shared_data import DataStore
+
+
+def count_rows(db_path):
+    """storeHouse rows in db_path and the partition files it lists"""
+    connection = sqlite3.connect(db_path)
+    paths = [db_path] + [os.path.join(os.path.dirname(db_path), path)
+                         for path, in connection.execute("SELECT path FROM partitions")]
+    connection.close()
+    stored = 0
+    for path in paths:
+        connection = sqlite3.connect(path)
+        stored += connection.execute("SELECT COUNT(*) FROM storeHouse").fetchone()[0]
+        connection.close()
+    return stored
+
+
+def run_mode(db_path, rows, buffered, batch_rows, flush_ms):
+    store = DataStore(db_path=db_path, buffered=buffered, batch_rows=batch_rows, flush_ms=flush_ms)
+    samples = []
+    start = time.perf_counter()
+    for i in range(rows):
+        t0 = time.perf_counter()
+        store.add_data(100 + i % 200, i % 7, (i * 13) % 100, 'seg_belt' if i % 2 else 'pickup_belt')
+        samples.append(time.perf_counter() - t0)
+    store.close()
+    elapsed = time.perf_counter() - start
+
+    stats = summarize(samples)
+    stats.update({'rows_per_s': round(rows / elapsed, 1), 'stored': count_rows(db_path)})
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataStore ingest benchmark')
+    parser.add_argument('--rows', type=int, default=2000, help='Rows inserted per mode [2000]')
+    parser.add_argument('--batch-rows', type=int, default=200, help='Writer batch size [200]')
+    parser.add_argument('--flush-ms', type=int, default=500, help='Writer flush interval [500]')
+    parser.add_argument('--output', default='bench_ingest.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    report = {'params': {'rows': args.rows, 'batch_rows': args.batch_rows, 'flush_ms': args.flush_ms},
+              'modes': {}}
+    print(f"{'mode':<16}{'rows/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'stored':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, buffered in (('commit_per_row', False), ('buffered', True)):
+            stats = run_mode(os.path.join(tmp, f'{name}.db'), args.rows, buffered, args.batch_rows, args.flush_ms)
+            report['modes'][name] = stats
+            print(f"{name:<16}{stats['rows_per_s']:>12.1f}{stats['p50_ms']:>10.4f}{stats['p99_ms']:>10.4f}"
+                  f"{stats['stored']:>9}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='modes', key='rows_per_s')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,96 @@
+"""
+Query latency and disk use of DataStore with everything in one file (partition=None) against
+monthly partition files, for growing amounts of history, plus what compact() leaves behind.
+
+History is generated in the original single-file layout (see datastore_queries). The single-file
+store upgrades a copy in place; the partitioned store imports it with import_history.
+
+    python -m benchmarks.datastore_partitions --months 3 24 --rows-per-day 2000 --output bench_partitions.json
+    python -m benchmarks.datastore_partitions --compare bench_partitions.json
+"""
+import argparse
+import datetime
+import glob
+import os
+import shutil
+import tempfile
+import time
+from benchmarks.datastore_queries import generate_legacy_db, time_calls
+from benchmarks.stats import print_comparison, write_report
+from shared_data import DataStore
+
+
+def layout_queries(store):
+    day = (datetime.date.today() - datetime.timedelta(days=45)).isoformat()
+    month_start = (datetime.date.today() - datetime.timedelta(days=75)).isoformat()
+    tail_cursor = store.last_row_id() - 30
+    return {
+        'selected_day': lambda: store.get_selected_data(day, day, 'seg_belt'),
+        'selected_30_days': lambda: store.get_selected_data(month_start, day, 'seg_belt'),
+        'last_row': lambda: store.get_last_row('seg_belt'),
+        'live_tick': lambda: store.get_rows_since('seg_belt', tail_cursor),
+        'group_month': lambda: store.group_by_data('Month', 'seg_belt'),
+    }
+
+
+def disk_mib(directory, stem):
+    return round(sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, f'{stem}*'))) / 2 ** 20, 1)
+
+
+def run_history(tmp, months, rows_per_day, repeats, raw_days):
+    days = months * 30
+    legacy = os.path.join(tmp, f'legacy{months}.db')
+    generate_legacy_db(legacy, rows_per_day * days, days)
+    results = {}
+
+    single = os.path.join(tmp, f'single{months}.db')
+    shutil.copy(legacy, single)
+    store = DataStore(db_path=single, partition=None)
+    results['single'] = {name: time_calls(fn, repeats)['p50_ms'] for name, fn in layout_queries(store).items()}
+    results['single']['disk_mib'] = disk_mib(tmp, f'single{months}')
+    store.close()
+
+    path = os.path.join(tmp, f'parted{months}.db')
+    store = DataStore(db_path=path, partition='month')
+    start = time.perf_counter()
+    store.import_history(legacy)
+    import_s = time.perf_counter() - start
+    results['partitioned'] = {name: time_calls(fn, repeats)['p50_ms'] for name, fn in layout_queries(store).items()}
+    results['partitioned'].update({'disk_mib': disk_mib(tmp, f'parted{months}'), 'import_s': round(import_s, 2)})
+
+    start = time.perf_counter()
+    store.compact(raw_days=raw_days)
+    results['partitioned'].update({'compact_s': round(time.perf_counter() - start, 3),
+                                   'disk_mib_compacted': disk_mib(tmp, f'parted{months}')})
+    store.close()
+    os.remove(legacy)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataStore partitioning benchmark')
+    parser.add_argument('--months', type=int, nargs='+', default=[3, 24], help='Months of history to generate')
+    parser.add_argument('--rows-per-day', type=int, default=2000, help='storeHouse rows per day [2000]')
+    parser.add_argument('--raw-days', type=int, default=90, help='Retention passed to compact() [90]')
+    parser.add_argument('--repeats', type=int, default=10, help='Timed calls per query [10]')
+    parser.add_argument('--output', default='bench_partitions.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    report = {'params': {'rows_per_day': args.rows_per_day, 'raw_days': args.raw_days, 'repeats': args.repeats},
+              'layouts': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for months in args.months:
+            for layout, stats in run_history(tmp, months, args.rows_per_day, args.repeats, args.raw_days).items():
+                report['layouts'][f'{layout} {months}mo'] = stats
+
+    names = list(next(iter(report['layouts'].values())))[:5]
+    print(f"\n{'layout':<20}" + ''.join(f"{name + ' ms':>20}" for name in names) + f"{'disk MiB':>10}{'compacted':>11}")
+    for layout, stats in report['layouts'].items():
+        print(f"{layout:<20}" + ''.join(f"{stats[name]:>20.3f}" for name in names) +
+              f"{stats['disk_mib']:>10.1f}{stats.get('disk_mib_compacted', stats['disk_mib']):>11.1f}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='layouts', key='selected_day')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,135 @@
+"""
+Dashboard query latency on a generated multi-million-row database, before and after the schema
+migrations in shared_data (row ids, (motor_class, time_stamp) indexes, exact-match queries and
+rollup tables behind group_by_data), plus the live graph's per-tick read before and after it
+moved to get_rows_since.
+
+The database is generated in the original unindexed layout with the same mix of belt names the
+line produced ("seg_belt" and "Pickup Belt"). The original LIKE queries are timed on it, then
+DataStore upgrades it in place and its methods are timed on the result.
+
+    python -m benchmarks.datastore_queries --rows 2000000 --days 60 --output bench_queries.json
+    python -m benchmarks.datastore_queries --rows 200000 --compare bench_queries.json
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import tempfile
+import time
+import pandas as pd
+from benchmarks.stats import print_comparison, summarize, write_report
+from shared_data import DataStore
+
+OLD_QUERIES = {
+    'last_row': ("SELECT speed FROM storeHouse WHERE motor_class LIKE ? ORDER BY time_stamp DESC LIMIT ?",
+                 lambda day: ['seg_belt', 1]),
+    'last_load': ("SELECT weight FROM load_data ORDER BY time_stamp DESC LIMIT ?", lambda day: [1]),
+    'selected_day': ("SELECT * FROM storeHouse WHERE motor_class LIKE ? AND time_stamp >= ? AND time_stamp <= ?",
+                     lambda day: ['pickup_belt', f'{day} 00:00:00', f'{day} 23:59:59']),
+    'selected_load_day': ("SELECT * FROM load_data WHERE time_stamp >= ? AND time_stamp <= ?",
+                          lambda day: [f'{day} 00:00:00', f'{day} 23:59:59']),
+    # What the live graph re-read every tick: all of today's rows for one belt
+    'live_tick': ("SELECT * FROM storeHouse WHERE motor_class LIKE ? AND time_stamp >= ? AND time_stamp <= ?",
+                  lambda day: ['seg_belt', f'{datetime.date.today()} 00:00:00', f'{datetime.date.today()} 23:59:59']),
+    'group_minute': ("SELECT *, STRFTIME('%Y-%m-%d %H:%M', time_stamp) as time_period, AVG(speed) as avgSpeed, "
+                     "COUNT(*) as record_count FROM storeHouse WHERE motor_class LIKE ? GROUP BY time_period "
+                     "ORDER BY time_period", lambda day: ['seg_belt']),
+    'group_week': ("SELECT *, STRFTIME('%Y-W%W', time_stamp) as time_period, AVG(speed) as avgSpeed, "
+                   "COUNT(*) as record_count FROM storeHouse WHERE motor_class LIKE ? GROUP BY time_period "
+                   "ORDER BY time_period", lambda day: ['seg_belt']),
+    'group_month': ("SELECT *, STRFTIME('%Y-%m', time_stamp) as time_period, AVG(speed) as avgSpeed, "
+                    "COUNT(*) as record_count FROM storeHouse WHERE motor_class LIKE ? GROUP BY time_period "
+                    "ORDER BY time_period", lambda day: ['seg_belt']),
+}
+
+
+def new_queries(store, day):
+    tail_cursor = store.last_row_id() - 30  # a tick that finds ~10 new seg_belt rows
+    return {
+        'last_row': lambda: store.get_last_row('seg_belt'),
+        'last_load': lambda: store.get_last_load(),
+        'selected_day': lambda: store.get_selected_data(day, day, 'pickup_belt'),
+        'selected_load_day': lambda: store.get_selected_load_data(day, day),
+        'live_tick': lambda: store.get_rows_since('seg_belt', tail_cursor),
+        'group_minute': lambda: store.group_by_data('Minute', 'seg_belt'),
+        'group_week': lambda: store.group_by_data('Week', 'seg_belt'),
+        'group_month': lambda: store.group_by_data('Month', 'seg_belt'),
+    }
+
+
+def generate_legacy_db(path, rows, days):
+    """storeHouse/load_data in the original schema, rows spread evenly over the last `days` days"""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE storeHouse(time_stamp datetime, speed float, objects float, area float, "
+                       "motor_class varchar(50))")
+    connection.execute("CREATE TABLE load_data(time_stamp datetime, load_type varchar(50), weight float, "
+                       "status varchar(20) DEFAULT 'normal')")
+    start = datetime.datetime.now() - datetime.timedelta(days=days)
+    step = days * 86400.0 / rows
+
+    def store_rows():
+        for i in range(rows):
+            ts = start + datetime.timedelta(seconds=i * step)
+            yield (ts.isoformat(' '), 100 + i % 200, i % 7, (i * 13) % 100, 'seg_belt' if i % 3 else 'Pickup Belt')
+
+    def load_rows():
+        for i in range(rows // 20):
+            ts = start + datetime.timedelta(seconds=i * step * 20)
+            yield (ts.isoformat(' '), 'type_one', float(i % 500), 'normal')
+
+    with connection:
+        connection.executemany("INSERT INTO storeHouse VALUES (?, ?, ?, ?, ?)", store_rows())
+        connection.executemany("INSERT INTO load_data VALUES (?, ?, ?, ?)", load_rows())
+    connection.close()
+
+
+def time_calls(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataStore query benchmark')
+    parser.add_argument('--rows', type=int, default=2000000, help='storeHouse rows to generate [2000000]')
+    parser.add_argument('--days', type=int, default=60, help='Days of history the rows cover [60]')
+    parser.add_argument('--repeats', type=int, default=10, help='Timed calls per query [10]')
+    parser.add_argument('--output', default='bench_queries.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    day = (datetime.date.today() - datetime.timedelta(days=args.days // 2)).isoformat()
+    report = {'params': {'rows': args.rows, 'days': args.days, 'repeats': args.repeats}, 'queries': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        start = time.perf_counter()
+        generate_legacy_db(path, args.rows, args.days)
+        print(f"Generated {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        connection = sqlite3.connect(path)
+        before = {name: time_calls(lambda: pd.read_sql_query(sql, connection, params=params(day)), args.repeats)
+                  for name, (sql, params) in OLD_QUERIES.items()}
+        connection.close()
+
+        start = time.perf_counter()
+        store = DataStore(db_path=path)
+        migrate_s = time.perf_counter() - start
+        after = {name: time_calls(fn, args.repeats) for name, fn in new_queries(store, day).items()}
+        store.close()
+
+    print(f"Schema migration took {migrate_s:.2f}s\n")
+    print(f"{'query':<20}{'before p50 ms':>15}{'after p50 ms':>15}{'speedup':>10}")
+    for name in OLD_QUERIES:
+        old_ms, new_ms = before[name]['p50_ms'], after[name]['p50_ms']
+        print(f"{name:<20}{old_ms:>15.3f}{new_ms:>15.3f}{old_ms / new_ms:>9.1f}x")
+        report['queries'][name] = dict(after[name], legacy_p50_ms=old_ms)
+    report['migration_s'] = round(migrate_s, 3)
+
+    if args.compare:
+        print_comparison(args.compare, report, section='queries', key='p50_ms')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,105 @@
+"""
+Compares the detector backends on CPU.
+
+Each backend runs in a fresh interpreter so startup time (detector imports + model load + first
+predict) is measured cold, then reports per-frame latency over --frames predicts. CONFIG is read
+from unified_motor_control.py's source and the frames are loaded before the startup clock starts.
+
+    python -m benchmarks.detector_backends --frames 200 --output bench_backends.json
+    python -m benchmarks.detector_backends --source runs/detect/train3/val_batch0_pred.jpg
+    python -m benchmarks.detector_backends --compare bench_backends.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from benchmarks.stats import control_config, print_comparison, summarize, write_report
+
+
+def load_frames(source, count, width, height):
+    import cv2
+    import numpy as np
+
+    if not source:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8)]
+
+    image = cv2.imread(source)
+    if image is not None:
+        return [image]
+
+    frames = []
+    cap = cv2.VideoCapture(source)
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"Could not read any frames from {source}")
+    return frames
+
+
+def run_backend(backend, args):
+    config = control_config()
+    model_cfg = dict(config['model'], backend=backend)
+    cam_cfg = config['cameras'][0]
+    frames = load_frames(args.source, args.frames, cam_cfg['width'], cam_cfg['height'])
+
+    start = time.perf_counter()
+    from detectors import create_detector
+    detector = create_detector(model_cfg)
+    detector.predict([frames[0]])
+    startup = time.perf_counter() - start
+
+    latencies = []
+    for i in range(args.frames):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        detector.predict([frame])
+        latencies.append(time.perf_counter() - t0)
+
+    stats = summarize(latencies)
+    stats['startup_s'] = round(startup, 3)
+    stats['fps'] = round(len(latencies) / sum(latencies), 1)
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Detector backend benchmark')
+    parser.add_argument('--backends', nargs='+', default=['ultralytics', 'onnxruntime'])
+    parser.add_argument('--frames', type=int, default=100, help='Number of timed predicts per backend')
+    parser.add_argument('--source', default=None, help='Image or video file, random frames if omitted')
+    parser.add_argument('--output', default='bench_backends.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.child:
+        print(json.dumps(run_backend(args.child, args)))
+        sys.exit(0)
+
+    report = {'params': {'frames': args.frames, 'source': args.source}, 'backends': {}}
+    print(f"{'backend':<14}{'startup s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'fps':>8}")
+    for backend in args.backends:
+        cmd = [sys.executable, '-m', 'benchmarks.detector_backends', '--child', backend,
+               '--frames', str(args.frames)]
+        if args.source:
+            cmd += ['--source', args.source]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{backend:<14} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        report['backends'][backend] = r
+        print(f"{backend:<14}{r['startup_s']:>10}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['fps']:>8}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='backends', key='p50_ms')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
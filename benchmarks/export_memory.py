@@ -0,0 +1,74 @@
+"""
+Peak memory and time of the dashboard download: the old whole-table path (get_all_data, then
+DataFrame.to_csv / to_excel) against the chunked exports in data_export, for growing tables.
+
+Excel is only measured when openpyxl is installed. Times are taken with tracemalloc running,
+which slows both paths down, so they are only comparable with each other.
+
+    python -m benchmarks.export_memory --rows 100000 1000000 --output bench_export.json
+    python -m benchmarks.export_memory --compare bench_export.json
+"""
+import argparse
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from benchmarks.datastore_queries import generate_legacy_db
+from benchmarks.stats import print_comparison, write_report
+from data_export import write_csv, write_excel
+from shared_data import DataStore
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 3), 'peak_mib': round(peak / 2 ** 20, 1)}
+
+
+def exports(store, out_dir):
+    def path(name):
+        return os.path.join(out_dir, name)
+
+    runs = {
+        'dataframe_csv': lambda: store.get_all_data().to_csv(path('old.csv')),
+        'chunked_csv': lambda: write_csv(path('new.csv'), store, 'storeHouse', key='seg_belt'),
+    }
+    if importlib.util.find_spec('openpyxl'):
+        runs['dataframe_xlsx'] = lambda: store.get_all_data().to_excel(path('old.xlsx'))
+        runs['chunked_xlsx'] = lambda: write_excel(path('new.xlsx'), store, 'storeHouse', key='seg_belt')
+    return runs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Dashboard export memory benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000], help='storeHouse rows to export')
+    parser.add_argument('--output', default='bench_export.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    report = {'params': {'rows': args.rows}, 'exports': {}}
+    print(f"{'export':<28}{'seconds':>10}{'peak MiB':>10}")
+    for rows in args.rows:
+        tmp = tempfile.mkdtemp()
+        try:
+            db_path = os.path.join(tmp, 'history.db')
+            generate_legacy_db(db_path, rows, 30)
+            store = DataStore(db_path=db_path)
+            for name, fn in exports(store, tmp).items():
+                stats = measure(fn)
+                report['exports'][f'{name} {rows}'] = stats
+                print(f"{name + ' ' + str(rows):<28}{stats['seconds']:>10.2f}{stats['peak_mib']:>10.1f}")
+            store.close()
+        finally:
+            shutil.rmtree(tmp)
+
+    if args.compare:
+        print_comparison(args.compare, report, section='exports', key='peak_mib')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
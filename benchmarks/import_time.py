@@ -0,0 +1,92 @@
+"""
+Cold-start import cost of the control process and the storage/tracker modules, measured with
+`python -X importtime` in a fresh interpreter per run.
+
+'control' imports exactly what unified_motor_control.py imports at the top, without running
+the script (no cameras, serial port or database). Import ms is the sum of the top-level
+cumulative times -X importtime reports; wall ms is the whole interpreter start to exit. The
+heaviest top-level imports of the last run are listed to show where the time goes.
+
+    python -m benchmarks.import_time --output bench_imports.json
+    python -m benchmarks.import_time --compare bench_imports.json
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+from benchmarks.stats import print_comparison, summarize, write_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def script_imports(path):
+    """The top-level import statements of a script, as source to run on their own"""
+    with open(path) as f:
+        source = f.read()
+    return '\n'.join(ast.get_source_segment(source, node) for node in ast.parse(source).body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_once(code):
+    """(import seconds, wall seconds, {top-level module: cumulative seconds}) for one fresh interpreter"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True,
+                            text=True)
+    wall = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # one space of indent: imported by the code itself
+            modules[name.strip()] = int(cumulative) / 1e6
+    return sum(modules.values()), wall, modules
+
+
+def measure(code, repeats):
+    import_once(code)  # warm the file system cache
+    imports, walls = [], []
+    for _ in range(repeats):
+        seconds, wall, modules = import_once(code)
+        imports.append(seconds)
+        walls.append(wall)
+    stats = summarize(imports)
+    stats['wall_p50_ms'] = summarize(walls)['p50_ms']
+    stats['heaviest'] = {name: round(seconds * 1000, 1) for name, seconds in
+                         sorted(modules.items(), key=lambda item: -item[1])[:5]}
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import time benchmark')
+    parser.add_argument('--repeats', type=int, default=10, help='Fresh interpreters per target [10]')
+    parser.add_argument('--output', default='bench_imports.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    targets = {
+        'control': script_imports(os.path.join(ROOT, 'unified_motor_control.py')),
+        'data_writer': 'import data_writer',
+        'shared_data': 'import shared_data',
+        'sort': 'import sort',
+    }
+    report = {'params': {'repeats': args.repeats}, 'targets': {}}
+    print(f"{'target':<14}{'import ms':>12}{'wall ms':>10}   heaviest")
+    for name, code in targets.items():
+        try:
+            stats = measure(code, args.repeats)
+        except RuntimeError as e:
+            print(f"{name:<14}{'-':>12}{'-':>10}   {e}")
+            continue
+        report['targets'][name] = stats
+        heaviest = ', '.join(f"{module} {ms:.0f}" for module, ms in stats['heaviest'].items())
+        print(f"{name:<14}{stats['p50_ms']:>12.1f}{stats['wall_p50_ms']:>10.1f}   {heaviest}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='targets', key='p50_ms')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
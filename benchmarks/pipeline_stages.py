@@ -0,0 +1,125 @@
+"""
+Per-stage latency of the vision-to-motor pipeline on synthetic frames and detections.
+
+Drives the real UnifiedMotorSystem.process_frame (post-processing only, detections are synthetic),
+Sort.update, DualMotorSpeedController.update_motor1_speed, DataStore.add_data (on a temporary
+database) and render_view (conveyor, detection and metric overlays), and reports p50/p95/p99 per
+stage plus the resulting frames per second. Results are written as JSON for comparison.
+
+    python -m benchmarks.pipeline_stages --frames 500 --objects 20 --output bench_pipeline.json
+    python -m benchmarks.pipeline_stages --compare bench_pipeline.json
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import shared_data
+from benchmarks.stats import print_comparison, summarize, write_report
+from detectors import Detections
+from replay import RecordingController
+from unified_motor_control import CONFIG, UnifiedMotorSystem
+
+STAGES = ['process_frame', 'sort_update', 'speed_update', 'datastore_add_data', 'render']
+
+
+class SyntheticScene:
+    """Boxes drifting down the conveyor, plus low-confidence clutter like conf_threshold lets through"""
+
+    def __init__(self, cam_cfg, objects, clutter, seed=0):
+        self.rng = np.random.default_rng(seed)
+        x1, y1, x2, y2 = cam_cfg['conveyor']['coords']
+        self.bounds = (x1, y1, x2, y2)
+        self.size = self.rng.uniform(30, 90, (objects, 2))
+        self.pos = np.column_stack([self.rng.uniform(x1, x2 - 90, objects), self.rng.uniform(y1, y2 - 90, objects)])
+        self.speed = self.rng.uniform(2, 6, objects)
+        self.clutter = clutter
+
+    def detections(self):
+        x1, y1, x2, y2 = self.bounds
+        self.pos[:, 1] += self.speed
+        wrapped = self.pos[:, 1] + self.size[:, 1] > y2
+        self.pos[wrapped, 1] = y1
+        boxes = np.column_stack([self.pos, self.pos + self.size])
+        conf = self.rng.uniform(0.4, 0.95, len(boxes))
+
+        clutter_xy = self.rng.uniform((x1, y1), (x2, y2), (self.clutter, 2))
+        clutter_boxes = np.column_stack([clutter_xy, clutter_xy + self.rng.uniform(5, 40, (self.clutter, 2))])
+        boxes = np.concatenate([boxes, clutter_boxes])
+        conf = np.concatenate([conf, self.rng.uniform(0.035, 0.2, self.clutter)])
+        cls = self.rng.integers(0, len(CONFIG['classes']), len(boxes))
+        return Detections(boxes.astype(np.float32), conf.astype(np.float32), cls)
+
+
+def run(args, db_path):
+    system = UnifiedMotorSystem(controller=RecordingController(),
+                                store=shared_data.DataStore(db_path=db_path))
+    for cam_cfg in CONFIG['cameras']:
+        system.init_camera_state(cam_cfg)
+
+    frame_idx = 0
+    cam_cfg = CONFIG['cameras'][frame_idx]
+    scene = SyntheticScene(cam_cfg, args.objects, args.clutter)
+    frame = np.random.default_rng(1).integers(0, 255, (cam_cfg['height'], cam_cfg['width'], 3), dtype=np.uint8)
+    tracker = system.trackers[frame_idx]
+    samples = {stage: [] for stage in STAGES}
+    totals = []
+
+    for i in range(args.warmup + args.frames):
+        result = scene.detections()
+        t0 = time.perf_counter()
+        detections, total_area = system.process_frame(frame, frame_idx, result)
+        t1 = time.perf_counter()
+        tracks = tracker.update(detections)
+        t2 = time.perf_counter()
+        system.speed_controller.update_motor1_speed(len(tracks), total_area)
+        t3 = time.perf_counter()
+        system.data_store.add_data(system.speed_controller.get_motor1_speed(), len(tracks), total_area,
+                                   cam_cfg['motor_class'])
+        t4 = time.perf_counter()
+        system.publish_view(frame_idx, frame, system.last_detections[frame_idx], total_area,
+                            system.speed_controller.get_motor1_speed(), len(tracks))
+        system.render_view(frame_idx, copy=True)
+        t5 = time.perf_counter()
+
+        if i < args.warmup:
+            continue
+        for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4), (t1, t2, t3, t4, t5)):
+            samples[stage].append(end - start)
+        totals.append(t5 - t0)
+
+    system.data_store.close()
+    stages = {stage: summarize(values) for stage, values in samples.items()}
+    stages['total'] = summarize(totals)
+    return {
+        'params': {'frames': args.frames, 'objects': args.objects, 'clutter': args.clutter},
+        'stages': stages,
+        'fps': round(len(totals) / sum(totals), 2),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Per-stage pipeline benchmark')
+    parser.add_argument('--frames', type=int, default=300, help='Timed frames [300]')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed frames first [20]')
+    parser.add_argument('--objects', type=int, default=15, help='Objects moving on the belt [15]')
+    parser.add_argument('--clutter', type=int, default=100, help='Low-confidence boxes per frame [100]')
+    parser.add_argument('--output', default='bench_pipeline.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run(args, os.path.join(tmp, 'bench.db'))
+
+    print(f"{'stage':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<24}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    print(f"\n{report['fps']} frames per second (excluding inference)")
+
+    if args.compare:
+        print_comparison(args.compare, report)
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,59 @@
+"""
+Measures the FPS gain of running the detector on the conveyor crop instead of the full frame,
+for every camera in CONFIG, using the backend selected in CONFIG['model'].
+
+    python -m benchmarks.roi_crop --frames 100 --output bench_roi.json
+    python -m benchmarks.roi_crop --compare bench_roi.json
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.stats import control_config, print_comparison, summarize, write_report
+from detectors import create_detector, crop_roi, predict_rois
+
+
+def time_predicts(detector, frame, frames, crop_coords=None):
+    """Latency stats plus fps of `frames` predicts on the full frame or its crop"""
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        if crop_coords is None:
+            detector.predict([frame])
+        else:
+            predict_rois(detector, [frame], [crop_coords])
+        samples.append(time.perf_counter() - start)
+    stats = summarize(samples)
+    stats['fps'] = round(len(samples) / sum(samples), 1)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Conveyor ROI crop benchmark')
+    parser.add_argument('--frames', type=int, default=50, help='Timed predicts per camera and mode')
+    parser.add_argument('--output', default='bench_roi.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    config = control_config()
+    detector = create_detector(config['model'])
+    rng = np.random.default_rng(0)
+
+    report = {'params': {'frames': args.frames, 'backend': config['model']['backend']}, 'runs': {}}
+    print(f"{'camera':<20}{'frame':>12}{'crop':>12}{'full fps':>10}{'crop fps':>10}{'gain':>8}")
+    for cam_cfg in config['cameras']:
+        frame = rng.integers(0, 255, (cam_cfg['height'], cam_cfg['width'], 3), dtype=np.uint8)
+        coords = cam_cfg['conveyor']['coords']
+        crop, _ = crop_roi(frame, coords)
+        detector.predict([frame])  # warm-up
+
+        full = time_predicts(detector, frame, args.frames)
+        cropped = time_predicts(detector, frame, args.frames, coords)
+        report['runs'][f"{cam_cfg['name']} full"] = dict(full, size='%dx%d' % frame.shape[1::-1])
+        report['runs'][f"{cam_cfg['name']} crop"] = dict(cropped, size='%dx%d' % crop.shape[1::-1])
+        print(f"{cam_cfg['name']:<20}{'%dx%d' % frame.shape[1::-1]:>12}{'%dx%d' % crop.shape[1::-1]:>12}"
+              f"{full['fps']:>10.1f}{cropped['fps']:>10.1f}{cropped['fps'] / full['fps']:>7.2f}x")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='runs', key='fps')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,62 @@
+import ast
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+
+CONTROL_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'unified_motor_control.py')
+
+
+def control_config(path=CONTROL_SCRIPT):
+    """
+    unified_motor_control.CONFIG read from the script's source, for benchmarks that only need the
+    settings and should not pay for (or time) importing the control process
+    """
+    with open(path) as f:
+        source = f.read()
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == 'CONFIG' for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"No CONFIG literal in {path}")
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    ms = np.asarray(samples, dtype=float) * 1000
+    return {
+        'count': int(ms.size),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def write_report(path, report):
+    """Writes a benchmark report as JSON with enough context to compare it against later runs"""
+    report = dict(report)
+    report.setdefault('meta', {}).update({
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    })
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def print_comparison(old_path, report, section='stages', key='p50_ms'):
+    """Prints key for every entry of report[section] next to the same entry in an older JSON report"""
+    with open(old_path) as f:
+        old = json.load(f).get(section, {})
+    print(f"\n{'':<24}{'before':>12}{'after':>12}{'change':>10}   ({key})")
+    for name, stats in report[section].items():
+        if name not in old:
+            print(f"{name:<24}{'-':>12}{stats[key]:>12.4f}")
+            continue
+        before, after = old[name][key], stats[key]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{name:<24}{before:>12.4f}{after:>12.4f}{change:>+9.1f}%")
@@ -0,0 +1,61 @@
+"""
+Tracker frames per second as the number of objects on the belt grows.
+
+Objects are laid out on a grid and drift down the frame with a little jitter, so every frame
+exercises predict, association and update for all of them.
+
+    python -m benchmarks.tracker_scaling --counts 1 10 50 100 200 500 --output bench_tracker.json
+    python -m benchmarks.tracker_scaling --compare bench_tracker.json
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.stats import print_comparison, summarize, write_report
+from sort import Sort
+
+
+def grid_scene(count, frames, seed=0):
+    """Yields (count, 5) detections per frame for count objects moving down in a grid"""
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(count)))
+    idx = np.arange(count)
+    origin = np.column_stack([(idx % cols) * 60.0, (idx // cols) * 60.0])
+    size = rng.uniform(20, 40, (count, 2))
+    for frame in range(frames):
+        xy = origin + [0.0, 3.0 * frame] + rng.normal(0, 0.5, (count, 2))
+        yield np.column_stack([xy, xy + size, rng.uniform(0.5, 1.0, count)])
+
+
+def run_count(count, frames, warmup):
+    tracker = Sort(max_age=20, min_hits=3, iou_threshold=0.3)
+    samples = []
+    for i, dets in enumerate(grid_scene(count, warmup + frames)):
+        start = time.perf_counter()
+        tracker.update(dets)
+        if i >= warmup:
+            samples.append(time.perf_counter() - start)
+    stats = summarize(samples)
+    stats['fps'] = round(len(samples) / sum(samples), 1)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SORT tracker scaling benchmark')
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 10, 50, 100, 200, 500])
+    parser.add_argument('--frames', type=int, default=100, help='Timed frames per object count [100]')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed frames first [5]')
+    parser.add_argument('--output', default='bench_tracker.json', help='JSON results file')
+    parser.add_argument('--compare', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    report = {'params': {'frames': args.frames}, 'objects': {}}
+    print(f"{'objects':>8}{'p50 ms':>10}{'p99 ms':>10}{'fps':>10}")
+    for count in args.counts:
+        stats = run_count(count, args.frames, args.warmup)
+        report['objects'][str(count)] = stats
+        print(f"{count:>8}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['fps']:>10.1f}")
+
+    if args.compare:
+        print_comparison(args.compare, report, section='objects', key='fps')
+    write_report(args.output, report)
+    print(f"Results written to {args.output}")
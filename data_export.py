@@ -0,0 +1,75 @@
+"""
+Streaming CSV/Excel export of the DataStore tables for the dashboard download button.
+
+Rows come from DataStore.iter_rows a chunk at a time, so memory stays at one chunk however large
+the selection is. CSV is produced as a generator of text chunks for a streamed HTTP response.
+Excel goes through openpyxl's write-only workbook into a file, starting a new sheet whenever one
+is full.
+
+    python data_export.py --format csv --belt seg_belt --start 2026-10-01 --end 2026-10-18 out.csv
+"""
+import csv
+import io
+from shared_data import RAW_COLUMNS
+
+# Rows per Excel sheet, less the header row
+MAX_SHEET_ROWS = 1048575
+
+
+def csv_chunks(store, table='storeHouse', startDate=None, endDate=None, key=None, chunk_rows=5000):
+    """Yields the CSV text of the selected rows, header first, one chunk of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RAW_COLUMNS[table])
+    for rows in store.iter_rows(table, startDate, endDate, key, chunk_rows):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_csv(path, store, table='storeHouse', startDate=None, endDate=None, key=None, chunk_rows=5000):
+    with open(path, 'w', newline='') as f:
+        for text in csv_chunks(store, table, startDate, endDate, key, chunk_rows):
+            f.write(text)
+
+
+def write_excel(path, store, table='storeHouse', startDate=None, endDate=None, key=None, chunk_rows=5000):
+    """Writes the selected rows to an .xlsx file with a write-only (streaming) openpyxl workbook"""
+    from openpyxl import Workbook  # only needed for Excel exports
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows = None, MAX_SHEET_ROWS
+    for rows in store.iter_rows(table, startDate, endDate, key, chunk_rows):
+        for row in rows:
+            if sheet_rows == MAX_SHEET_ROWS:
+                sheet = workbook.create_sheet(title=f"{table}_{len(workbook.worksheets) + 1}")
+                sheet.append(RAW_COLUMNS[table])
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(title=f"{table}_1").append(RAW_COLUMNS[table])
+    workbook.save(path)
+
+
+if __name__ == '__main__':
+    import argparse
+    from shared_data import DataStore
+
+    parser = argparse.ArgumentParser(description='Export DataStore rows to CSV or Excel')
+    parser.add_argument('output', help='File to write')
+    parser.add_argument('--db', default="data_file_4.db", help='Database file [data_file_4.db]')
+    parser.add_argument('--format', default='csv', choices=['csv', 'xlsx'], help='Output format [csv]')
+    parser.add_argument('--table', default='storeHouse', choices=list(RAW_COLUMNS), help='Table [storeHouse]')
+    parser.add_argument('--belt', default=None, help='motor_class (or load_type) to keep, all if omitted')
+    parser.add_argument('--start', default=None, help='First day (YYYY-MM-DD)')
+    parser.add_argument('--end', default=None, help='Last day (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    store = DataStore(db_path=args.db)
+    write = write_csv if args.format == 'csv' else write_excel
+    write(args.output, store, args.table, args.start, args.end, args.belt)
+    store.close()
+    print(f"💾 Exported {args.table} to {args.output}")
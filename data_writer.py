@@ -0,0 +1,728 @@
+"""
+Ingest side of the DataStore: schema migrations, the partition files and their catalog, the
+buffered writer thread and rollup folding, retention and history import.
+
+Only the standard library is imported, so the control process can store rows without loading
+pandas or NumPy. shared_data.DataStore adds the queries for the dashboard on top of DataWriter.
+"""
+import calendar
+import datetime
+import os
+import queue
+import sqlite3 as db
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+
+# Columns of the raw tables, in table order
+RAW_COLUMNS = {
+    'storeHouse': ('id', 'time_stamp', 'speed', 'objects', 'area', 'motor_class'),
+    'load_data': ('id', 'time_stamp', 'load_type', 'weight', 'status'),
+}
+INSERTS = {
+    'storeHouse': "INSERT INTO {schema}.storeHouse (time_stamp, speed, objects, area, motor_class) VALUES (?, ?, ?, ?, ?)",
+    'load_data': "INSERT INTO {schema}.load_data (time_stamp, load_type, weight) VALUES (?, ?, ?)",
+}
+_FLUSH = object()
+_STOP = object()
+# Backoff of the writer thread while the database is locked (e.g. by a maintenance run) or full, in seconds
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5.0
+# How long a group is retried before its rows are written one by one, and how long close() waits
+MAX_RETRY_SECONDS = 60.0
+CLOSE_TIMEOUT = 10.0
+# Primary result codes worth a retry; anything else (no such table, readonly database) is permanent
+TRANSIENT_CODES = (db.SQLITE_BUSY, db.SQLITE_LOCKED, db.SQLITE_FULL)
+TRANSIENT_MESSAGES = ('database is locked', 'database table is locked', 'database or disk is full')
+
+
+def _create_base_tables(cur):
+    """v1: the original unindexed tables"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS storeHouse(
+        time_stamp datetime,
+        speed float,
+        objects float,
+        area float,
+        motor_class varchar(50)
+    );""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS load_data(
+        time_stamp datetime,
+        load_type varchar(50),
+        weight float,
+        status varchar(20) DEFAULT 'normal');
+    """)
+
+
+def _rebuild_table(cur, table, create_sql, columns):
+    """
+    Recreates table from create_sql and copies the old rows over in insertion order.
+    columns maps each new column to the expression that fills it from the old table, or to a
+    fallback used when the old table doesn't have that column.
+    """
+    existing = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+    exprs = [expr if name in existing else fallback for name, (expr, fallback) in columns.items()]
+    cur.execute(create_sql.format(table=f"{table}_new"))
+    cur.execute(f"INSERT INTO {table}_new ({', '.join(columns)}) "
+                f"SELECT {', '.join(exprs)} FROM {table} ORDER BY rowid")
+    cur.execute(f"DROP TABLE {table}")
+    cur.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+def _add_row_ids(cur):
+    """
+    v2: explicit INTEGER PRIMARY KEY ids, which stay stable across VACUUM and can be used as
+    cursors. Also normalises motor_class ("Pickup Belt" -> "pickup_belt") so queries can use
+    exact matches; the old LIKE queries only matched those rows by way of its '_' wildcard.
+    """
+    _rebuild_table(cur, "storeHouse", """CREATE TABLE {table}(
+        id INTEGER PRIMARY KEY,
+        time_stamp datetime,
+        speed float,
+        objects float,
+        area float,
+        motor_class varchar(50)
+    );""", {
+        'time_stamp': ('time_stamp', 'NULL'),
+        'speed': ('speed', 'NULL'),
+        'objects': ('objects', 'NULL'),
+        'area': ('area', 'NULL'),
+        'motor_class': ("LOWER(REPLACE(motor_class, ' ', '_'))", 'NULL'),
+    })
+    _rebuild_table(cur, "load_data", """CREATE TABLE {table}(
+        id INTEGER PRIMARY KEY,
+        time_stamp datetime,
+        load_type varchar(50),
+        weight float,
+        status varchar(20) DEFAULT 'normal');
+    """, {
+        'time_stamp': ('time_stamp', 'NULL'),
+        'load_type': ('load_type', 'NULL'),
+        'weight': ('weight', 'NULL'),
+        'status': ('status', "'normal'"),
+    })
+
+
+def _add_indexes(cur):
+    """v3: indexes behind the per-belt and date range queries"""
+    cur.execute("CREATE INDEX IF NOT EXISTS storeHouse_class_time ON storeHouse(motor_class, time_stamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS storeHouse_time ON storeHouse(time_stamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS load_data_type_time ON load_data(load_type, time_stamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS load_data_time ON load_data(time_stamp)")
+
+
+# Buckets kept in the rollup tables; coarser views are grouped from the Day rollup
+ROLLUP_BUCKETS = {
+    'Minute': "%Y-%m-%d %H:%M",
+    'Hour': "%Y-%m-%d %H:00",
+    'Day': "%Y-%m-%d",
+}
+ROLLUPS = {
+    # rollup table: (raw table, key column, measured columns)
+    'storeHouse_rollup': ('storeHouse', 'motor_class', ('speed', 'objects', 'area')),
+    'load_data_rollup': ('load_data', 'load_type', ('weight',)),
+}
+
+
+def _rollup_trigger_sql(rollup, raw, key, values):
+    """AFTER INSERT trigger that folds each new raw row into its Minute, Hour and Day buckets"""
+    columns = ['period', 'bucket', key, 'record_count'] + [f"{v}_{agg}" for v in values for agg in ('sum', 'min', 'max')]
+    updates = ['record_count = record_count + 1']
+    for v in values:
+        updates += [f"{v}_sum = {v}_sum + excluded.{v}_sum", f"{v}_min = MIN({v}_min, excluded.{v}_min)",
+                    f"{v}_max = MAX({v}_max, excluded.{v}_max)"]
+    upserts = []
+    for period, fmt in ROLLUP_BUCKETS.items():
+        row = [f"'{period}'", f"STRFTIME('{fmt}', NEW.time_stamp)", f"COALESCE(NEW.{key}, '')", '1']
+        row += [f"NEW.{v}" for v in values for _ in range(3)]
+        upserts.append(f"INSERT INTO {rollup} ({', '.join(columns)}) VALUES ({', '.join(row)}) "
+                       f"ON CONFLICT(period, {key}, bucket) DO UPDATE SET {', '.join(updates)};")
+    return (f"CREATE TRIGGER IF NOT EXISTS {rollup}_insert AFTER INSERT ON {raw} "
+            f"WHEN NEW.time_stamp IS NOT NULL BEGIN {' '.join(upserts)} END")
+
+
+def fold_rollups(cur, schema='main', after_id=0, tables=None):
+    """
+    Adds the raw rows of schema's tables with id > after_id into the rollup tables in main.
+    tables limits it to some raw tables; after_id is then {raw table: id}.
+    """
+    for rollup, (raw, key, values) in ROLLUPS.items():
+        if tables is not None and raw not in tables:
+            continue
+        first_id = after_id[raw] if isinstance(after_id, dict) else after_id
+        columns = ', '.join(f"{v}_{agg}" for v in values for agg in ('sum', 'min', 'max'))
+        aggregates = ', '.join(f"SUM({v}), MIN({v}), MAX({v})" for v in values)
+        updates = ['record_count = record_count + excluded.record_count']
+        for v in values:
+            updates += [f"{v}_sum = {v}_sum + excluded.{v}_sum", f"{v}_min = MIN({v}_min, excluded.{v}_min)",
+                        f"{v}_max = MAX({v}_max, excluded.{v}_max)"]
+        for period, fmt in ROLLUP_BUCKETS.items():
+            cur.execute(f"INSERT INTO main.{rollup} (period, bucket, {key}, record_count, {columns}) "
+                        f"SELECT ?, STRFTIME('{fmt}', time_stamp) AS b, COALESCE({key}, '') AS k, COUNT(*), "
+                        f"{aggregates} FROM {schema}.{raw} WHERE id > ? AND time_stamp IS NOT NULL GROUP BY b, k "
+                        f"ON CONFLICT(period, {key}, bucket) DO UPDATE SET {', '.join(updates)}", (period, first_id))
+
+
+def rebuild_rollups(cur, schemas=('main',), since=''):
+    """
+    Recomputes every rollup table from the raw rows it summarises in schemas. since keeps the
+    buckets before that day ('YYYY-MM-DD'), whose raw rows compaction has already deleted.
+    """
+    for rollup in ROLLUPS:
+        cur.execute(f"DELETE FROM main.{rollup} WHERE bucket >= ?", [since])
+    for schema in schemas:
+        fold_rollups(cur, schema)
+
+
+def _add_rollups(cur):
+    """v4: Minute/Hour/Day rollups kept current by insert triggers, backfilled from existing rows"""
+    for rollup, (raw, key, values) in ROLLUPS.items():
+        measures = ', '.join(f"{v}_sum float, {v}_min float, {v}_max float" for v in values)
+        cur.execute(f"""CREATE TABLE IF NOT EXISTS {rollup}(
+            period varchar(10) NOT NULL,
+            bucket varchar(20) NOT NULL,
+            {key} varchar(50) NOT NULL,
+            record_count integer NOT NULL,
+            {measures},
+            PRIMARY KEY (period, {key}, bucket)
+        );""")
+        cur.execute(_rollup_trigger_sql(rollup, raw, key, values))
+    rebuild_rollups(cur)
+
+
+def _add_partitions(cur):
+    """
+    v5: catalog of the partition files raw rows are written to. The rollups stay in this
+    database and are now folded in by DataStore per written batch, so the row triggers go.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS partitions(
+        name varchar(10) PRIMARY KEY,
+        path varchar(255) NOT NULL,
+        first_day date NOT NULL,
+        last_day date NOT NULL
+    );""")
+    for rollup in ROLLUPS:
+        cur.execute(f"DROP TRIGGER IF EXISTS {rollup}_insert")
+
+
+# Schema version n is reached by applying MIGRATIONS[:n]; append new steps, never edit old ones
+MIGRATIONS = [_create_base_tables, _add_row_ids, _add_indexes, _add_rollups, _add_partitions]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Raw tables of a partition file. AUTOINCREMENT lets a new partition continue the ids of the
+# previous one, so ids stay usable as get_rows_since cursors across files.
+PARTITION_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS {schema}.storeHouse(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        time_stamp datetime,
+        speed float,
+        objects float,
+        area float,
+        motor_class varchar(50)
+    );""",
+    """CREATE TABLE IF NOT EXISTS {schema}.load_data(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        time_stamp datetime,
+        load_type varchar(50),
+        weight float,
+        status varchar(20) DEFAULT 'normal');
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.storeHouse_class_time ON storeHouse(motor_class, time_stamp)",
+    "CREATE INDEX IF NOT EXISTS {schema}.storeHouse_time ON storeHouse(time_stamp)",
+    "CREATE INDEX IF NOT EXISTS {schema}.load_data_type_time ON load_data(load_type, time_stamp)",
+    "CREATE INDEX IF NOT EXISTS {schema}.load_data_time ON load_data(time_stamp)",
+]
+# Partition name = this many leading characters of the row's 'YYYY-MM-DD ...' time stamp
+PARTITION_KEYS = {'day': 10, 'month': 7}
+# SQLite allows 10 attached databases per connection by default
+MAX_ATTACHED = 8
+
+
+def partition_path(db_path, name):
+    """data_file_4.db -> data_file_4.2026-10.db"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.{name}{ext or '.db'}"
+
+
+def partition_days(name):
+    """First and last day ('YYYY-MM-DD') held by a day or month partition"""
+    if len(name) == PARTITION_KEYS['day']:
+        return name, name
+    year, month = int(name[:4]), int(name[5:7])
+    return f"{name}-01", f"{name}-{calendar.monthrange(year, month)[1]:02d}"
+
+
+def _transient(error):
+    """True for errors that can go away on a retry: the database busy, locked or full"""
+    code = getattr(error, 'sqlite_errorcode', None)  # Python 3.11+
+    if code is not None:
+        return code & 0xff in TRANSIENT_CODES
+    return any(message in str(error) for message in TRANSIENT_MESSAGES)
+
+
+def _group_rows(group):
+    """Number of rows in a {partition name: {table: rows}} group"""
+    return sum(len(batch) for tables in group.values() for batch in tables.values())
+
+
+class _Attachments:
+    """Partition files ATTACHed to one connection, kept between queries, least recently used detached first"""
+
+    def __init__(self, connection, directory, read_only=False):
+        self.connection = connection
+        self.directory = directory
+        self.read_only = read_only  # the connection must then have been opened with uri=True
+        self.schemas = OrderedDict()  # catalog path -> schema name
+        self.count = 0
+
+    def ensure(self, paths):
+        """Attaches paths (at most MAX_ATTACHED) and returns their schema names in the same order"""
+        for path in paths:
+            if path in self.schemas:
+                self.schemas.move_to_end(path)
+        missing = [path for path in paths if path not in self.schemas]
+        while len(self.schemas) + len(missing) > MAX_ATTACHED:
+            self.forget(next(iter(self.schemas)))
+        for path in missing:
+            schema = f"part{self.count}"
+            self.count += 1
+            target = os.path.join(self.directory, path)
+            if self.read_only:
+                target = f"file:{target}?mode=ro"
+            self.connection.execute("ATTACH DATABASE ? AS " + schema, [target])
+            self.schemas[path] = schema
+        return [self.schemas[path] for path in paths]
+
+    def forget(self, path):
+        schema = self.schemas.pop(path, None)
+        if schema:
+            self.connection.execute(f"DETACH DATABASE {schema}")
+
+
+class DataWriter:
+    def __init__(self, make_table=True, db_path="data_file_4.db", buffered=True, batch_rows=200, flush_ms=500,
+                 partition='month', raw_days=None, minute_days=None, archive_dir=None):
+        """
+        buffered: add_data/add_load_data only queue the row; a background writer thread inserts
+        queued rows with executemany once batch_rows are waiting or flush_ms has passed since the
+        oldest one, so callers never wait on a commit. buffered=False writes and commits each row
+        in the caller, as before.
+
+        partition: 'day' or 'month' writes raw rows to one file per period next to db_path
+        (data_file_4.2026-10.db), listed in its partitions table; db_path keeps the catalog, the
+        rollups and any rows written before partitioning. None writes everything to db_path.
+        raw_days/minute_days: retention applied by compact() each time a new partition is started.
+        archive_dir: finished partitions are also written there as column files (history_archive)
+        when a new partition starts, and always before compaction deletes them.
+
+        All writes (the writer thread, unbuffered rows, maintenance) go through one writer
+        connection under write_lock.
+        """
+        self.db_path = db_path
+        self.directory = os.path.dirname(os.path.abspath(db_path))
+        # The writer connection, used by whichever thread holds write_lock
+        self.connection = db.connect(db_path, check_same_thread=False)
+        # WAL lets readers (the dashboard's DataStore) read while the writer commits
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.createTables()  # Changed from createTable to createTables
+        self.write_lock = Lock()
+        self.attachments = _Attachments(self.connection, self.directory)
+
+        self.partition = partition
+        self.raw_days = raw_days
+        self.minute_days = minute_days
+        self.archive_dir = archive_dir
+        self.buffered = buffered
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_ms / 1000.0
+        self.queue = queue.Queue()
+        self.writer = None
+        self.closed = False
+
+    def createTables(self):
+        """
+        Creates the tables or upgrades an existing database in place to SCHEMA_VERSION, tracked
+        in PRAGMA user_version. Each pending migration runs once, all in one transaction.
+        """
+        cur = self.connection.cursor()
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        # Take the write lock first so a second process starting up waits instead of migrating too
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            for migration in MIGRATIONS[version:]:
+                migration(cur)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        if version < SCHEMA_VERSION:
+            print(f"🗄️ Upgraded {self.db_path} schema from v{version} to v{SCHEMA_VERSION}")
+
+    def insertRow(self, speed, objects, area, motor_class):
+        curDate = datetime.datetime.now()
+        self._write('storeHouse', (curDate, speed, objects, area, motor_class))
+
+    def insertLoadData(self, load_type, weight, status="normal"):
+        """Insert a new load measurement into the database"""
+        print("Load Inserted")
+        curDate = datetime.datetime.now()
+        self._write('load_data', (curDate, load_type, weight))
+
+    def _write(self, table, row):
+        if not self.buffered:
+            with self.write_lock:
+                self._write_rows([(table, row)])
+            return
+        if self.writer is None:
+            # Started on first use, so read-only users like the dashboard never run one
+            self.writer = Thread(target=self._writer_loop, name="datastore-writer", daemon=True)
+            self.writer.start()
+        self.queue.put((table, row))
+
+    def flush(self):
+        """Blocks until every row queued so far is committed"""
+        if self.writer is not None:
+            self.queue.put(_FLUSH)
+            self.queue.join()
+
+    def _writer_loop(self):
+        pending = []
+        deadline = None
+        running = True
+        while running:
+            timeout = None if not pending else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # oldest pending row has waited flush_interval
+
+            markers = 0
+            if item is _STOP:
+                running = False
+                markers = 1
+            elif item is _FLUSH:
+                markers = 1
+            elif item is not None:
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(item)
+
+            if pending and (item is None or markers or len(pending) >= self.batch_rows
+                            or time.monotonic() >= deadline):
+                self._write_pending(pending)
+                for _ in pending:
+                    self.queue.task_done()
+                pending = []
+            for _ in range(markers):
+                self.queue.task_done()
+
+    def _groups(self, rows):
+        """
+        Splits (table, row) items into {partition name: {table: rows}} groups of at most
+        MAX_ATTACHED partitions, so a group's partitions can all be attached at once
+        """
+        by_partition = {}
+        for table, row in rows:
+            name = str(row[0])[:PARTITION_KEYS[self.partition]] if self.partition else None
+            by_partition.setdefault(name, {}).setdefault(table, []).append(row)
+        names = list(by_partition)
+        return [{name: by_partition[name] for name in names[i:i + MAX_ATTACHED]}
+                for i in range(0, len(names), MAX_ATTACHED)]
+
+    def _write_rows(self, rows):
+        """
+        Writes (table, row) items group by group, each committed on its own; db.Error from a
+        failing group is raised, with the groups before it in. Call with write_lock held.
+        """
+        for group in self._groups(rows):
+            self._write_batch(group)
+
+    def _write_pending(self, rows):
+        """
+        Writes the writer thread's rows. A group failing because the database is busy, locked or
+        full is retried with backoff for up to MAX_RETRY_SECONDS (not once close() has been
+        called). Other errors won't go away on a retry: the group is then written row by row,
+        dropping only the rows that still fail, as it is once the retries run out.
+        """
+        for group in self._groups(rows):
+            delay = RETRY_DELAY
+            give_up = time.monotonic() + MAX_RETRY_SECONDS
+            while True:
+                try:
+                    with self.write_lock:
+                        self._write_batch(group)
+                    break
+                except db.Error as e:
+                    if not _transient(e) or self.closed or time.monotonic() + delay > give_up:
+                        print(f"⚠️ DataStore could not write {_group_rows(group)} rows, writing them one by one: {e}")
+                        self._write_singly(group)
+                        break
+                    print(f"⚠️ DataStore could not write {_group_rows(group)} rows, retrying in {delay:.1f}s: {e}")
+                    time.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _write_singly(self, group):
+        dropped = 0
+        for name, tables in group.items():
+            for table, batch in tables.items():
+                for row in batch:
+                    try:
+                        with self.write_lock:
+                            self._write_batch({name: {table: [row]}})
+                    except db.Error as e:
+                        dropped += 1
+                        print(f"⚠️ DataStore dropped a {table} row {row}: {e}")
+        if dropped:
+            print(f"⚠️ DataStore dropped {dropped} of {_group_rows(group)} rows")
+
+    def _write_batch(self, group):
+        """
+        Inserts one group from _groups into its partitions and folds it into the rollups, in one
+        transaction on the writer connection. Call with write_lock held.
+        """
+        connection = self.connection
+        started = []
+        # ATTACH can't run inside a transaction, so new partitions are opened first
+        schemas = {}
+        for name in group:
+            schemas[name], created = self._open_partition(name) if name else ('main', False)
+            if created:
+                started.append(name)
+        with connection:
+            for name, tables in group.items():
+                schema = schemas[name]
+                after_id = {table: connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {schema}.{table}")
+                            .fetchone()[0] for table in tables}
+                for table, batch in tables.items():
+                    connection.executemany(INSERTS[table].format(schema=schema), batch)
+                fold_rollups(connection, schema, after_id, tables)
+        if started:
+            self._partition_started(max(started))
+
+    def _partition_started(self, name):
+        """
+        Once the rows of a batch that started partition `name` are in, the partitions before it
+        are complete: archive them and apply retention. This runs in the writer thread, so a
+        failure is only logged; whatever was left undone is picked up at the next partition start.
+        """
+        try:
+            if self.archive_dir:
+                self._archive(partition_days(name)[0])
+            if self.raw_days is not None or self.minute_days is not None:
+                self._compact(self.raw_days, self.minute_days)
+        except Exception as e:
+            print(f"⚠️ DataStore maintenance after starting partition {name} failed, will retry: {e}")
+
+    def _open_partition(self, name):
+        """
+        (schema name, created) of partition `name` attached to connection, creating the file and
+        its catalog entry if it is new
+        """
+        connection, attachments = self.connection, self.attachments
+        path = os.path.basename(partition_path(self.db_path, name))
+        if path in attachments.schemas:
+            return attachments.ensure([path])[0], False
+        known = connection.execute("SELECT 1 FROM partitions WHERE name = ?", [name]).fetchone()
+        if known:
+            return attachments.ensure([path])[0], False
+
+        previous = connection.execute("SELECT path FROM partitions ORDER BY first_day DESC LIMIT 1").fetchone()
+        schema = attachments.ensure([path])[0]
+        connection.execute(f"PRAGMA {schema}.journal_mode=WAL")
+        for sql in PARTITION_SCHEMA:
+            connection.execute(sql.format(schema=schema))
+        sources = ['main'] + (attachments.ensure([previous[0]]) if previous else [])
+        first_day, last_day = partition_days(name)
+        with connection:
+            for table in INSERTS:
+                last_id = max(connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {source}.{table}").fetchone()[0]
+                              for source in sources)
+                connection.execute(f"INSERT INTO {schema}.sqlite_sequence (name, seq) SELECT ?, ? WHERE NOT EXISTS "
+                                   f"(SELECT 1 FROM {schema}.sqlite_sequence WHERE name = ?)", [table, last_id, table])
+            connection.execute("INSERT OR IGNORE INTO partitions (name, path, first_day, last_day) VALUES (?, ?, ?, ?)",
+                               [name, path, first_day, last_day])
+        print(f"🗄️ Started partition {path}")
+        return attachments.ensure([path])[0], True
+
+    def _partitions(self, connection, start=None, end=None, newest_first=False):
+        """Catalog paths of the partitions holding any day between start and end ('YYYY-MM-DD...', None = open)"""
+        order = 'DESC' if newest_first else 'ASC'
+        return [path for path, in connection.execute(
+            f"SELECT path FROM partitions WHERE last_day >= ? AND first_day <= ? ORDER BY first_day {order}",
+            [(start or '0000-00-00')[:10], (end or '9999-12-31')[:10]])]
+
+    def _sources(self, attachments, start=None, end=None, newest_first=False):
+        """
+        Yields lists of schema names covering the main database and the partitions overlapping
+        start..end, attaching at most MAX_ATTACHED partitions at a time to attachments' connection
+        (a checked-out reader, or the writer's with write_lock held).
+        """
+        paths = self._partitions(attachments.connection, start, end, newest_first)
+        chunks = [paths[i:i + MAX_ATTACHED] for i in range(0, len(paths), MAX_ATTACHED)] or [[]]
+        for i, chunk in enumerate(chunks):
+            schemas = attachments.ensure(chunk)
+            # Rows written before partitioning stay in main; they are older than any partition
+            if newest_first and i == len(chunks) - 1:
+                schemas = schemas + ['main']
+            elif not newest_first and i == 0:
+                schemas = ['main'] + schemas
+            yield schemas
+
+    def add_data(self, speed, objects, area, motor_class):
+        self.insertRow(speed, objects, area, motor_class)
+
+    def add_load_data(self, load_type, weight, status="normal"):
+        self.insertLoadData(load_type, weight, status)
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """
+        Commits every queued row, stops the writer thread and closes the database. If the writer
+        is still busy after timeout seconds, its rows are left to it and the connection stays
+        open, so shutdown never hangs on a stuck database.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer is not None:
+            self.queue.put(_STOP)
+            self.writer.join(timeout)
+            if self.writer.is_alive():
+                print(f"⚠️ DataStore writer still busy after {timeout:.0f}s, "
+                      f"about {self.queue.qsize()} queued rows may be lost")
+                return
+        self.connection.commit()
+        self.connection.close()
+
+    def rebuild_rollups(self):
+        """
+        Recomputes the rollup tables from the raw rows still held, e.g. after editing rows by hand.
+        Buckets older than the oldest raw day are left alone, since compact() deleted their rows.
+        """
+        self.flush()
+        with self.write_lock:
+            oldest = [self.connection.execute(f"SELECT DATE(MIN(time_stamp)) FROM main.{table}").fetchone()[0]
+                      for table in INSERTS]
+            oldest.append(self.connection.execute("SELECT MIN(first_day) FROM partitions").fetchone()[0])
+            since = min([day for day in oldest if day] or [''])
+            for i, schemas in enumerate(self._sources(self.attachments)):
+                with self.connection:
+                    if i == 0:
+                        rebuild_rollups(self.connection, schemas, since)
+                    else:
+                        for schema in schemas:
+                            fold_rollups(self.connection, schema)
+
+    def compact(self, raw_days=90, minute_days=365):
+        """
+        Retention for long runs: deletes the partition files whose last day is more than raw_days
+        ago, rows that old still kept in the main database, and Minute rollup buckets older than
+        minute_days. Rows are folded into the rollups as they are written, so the grouped views
+        keep the full history at Hour/Day (and recent Minute) resolution.
+        With an archive_dir, partitions are archived first and kept if that fails.
+        Returns (removed partition paths, deleted main database rows).
+        """
+        self.flush()
+        with self.write_lock:
+            return self._compact(raw_days, minute_days)
+
+    def _compact(self, raw_days, minute_days):
+        """compact() on the writer connection, with write_lock held"""
+        connection = self.connection
+        today = datetime.date.today()
+        old, deleted, trimmed = [], 0, 0
+        with connection:
+            if raw_days is not None:
+                cutoff = (today - datetime.timedelta(days=raw_days)).isoformat()
+                # Partitions are only deleted once they are safely in the archive, if there is one
+                if not self.archive_dir or self._archive(cutoff):
+                    old = connection.execute("SELECT name, path FROM partitions WHERE last_day < ?",
+                                             [cutoff]).fetchall()
+                for table in INSERTS:
+                    deleted += connection.execute(f"DELETE FROM main.{table} WHERE time_stamp < ?", [cutoff]).rowcount
+            if minute_days is not None:
+                cutoff = (today - datetime.timedelta(days=minute_days)).isoformat()
+                for rollup in ROLLUPS:
+                    trimmed += connection.execute(f"DELETE FROM main.{rollup} WHERE period = 'Minute' AND bucket < ?",
+                                                  [cutoff]).rowcount
+
+        removed = []
+        for name, path in old:
+            self._forget_partition(path)
+            try:
+                self._remove_partition_file(path)
+            except OSError as e:
+                # e.g. still open in the dashboard on Windows; it stays listed and is retried next time
+                print(f"⚠️ Could not remove partition {path}, keeping it for now: {e}")
+                continue
+            with connection:
+                connection.execute("DELETE FROM partitions WHERE name = ?", [name])
+            removed.append(path)
+        if deleted or trimmed:
+            # Give the freed pages of the main database back to the file system, WAL included
+            connection.execute("VACUUM")
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if removed or deleted:
+            print(f"🧹 Compacted {self.db_path}: removed {len(removed)} partitions and {deleted} rows "
+                  f"older than {raw_days} days, {trimmed} Minute rollups older than {minute_days} days")
+        return removed, deleted
+
+    def _remove_partition_file(self, path):
+        """Deletes a partition file, then its WAL files; raises OSError if the file itself can't go"""
+        target = os.path.join(self.directory, path)
+        if os.path.exists(target):
+            os.remove(target)
+        for suffix in ('-wal', '-shm'):
+            try:
+                os.remove(target + suffix)
+            except OSError:
+                pass
+
+    def _forget_partition(self, path):
+        """Detaches a partition file compaction is about to delete"""
+        self.attachments.forget(path)
+
+    def _archive(self, before=None):
+        from history_archive import archive_closed_partitions  # NumPy, only needed once there is an archive
+
+        try:
+            archive_closed_partitions(self.db_path, self.archive_dir, before)
+            return True
+        except (OSError, db.Error) as e:
+            print(f"⚠️ Could not archive partitions to {self.archive_dir}: {e}")
+            return False
+
+    def import_history(self, path, chunk_rows=10000):
+        """
+        Copies the storeHouse/load_data rows of another database file (data_file_2.db and the
+        like, from when the path was changed by hand) into this store's partitions and rollups.
+        The file is only read. Returns the number of rows imported; a failed write raises, with
+        the chunks before it already committed.
+        """
+        self.flush()
+        source = db.connect(f"file:{path}?mode=ro", uri=True)
+        imported = 0
+        try:
+            for table, columns in (('storeHouse', ('time_stamp', 'speed', 'objects', 'area', 'motor_class')),
+                                   ('load_data', ('time_stamp', 'load_type', 'weight'))):
+                existing = {row[1] for row in source.execute(f"PRAGMA table_info({table})")}
+                if 'time_stamp' not in existing:
+                    continue
+                exprs = [column if column in existing else 'NULL' for column in columns]
+                if 'motor_class' in existing:
+                    exprs[-1] = "LOWER(REPLACE(motor_class, ' ', '_'))"
+                rows = source.execute(f"SELECT {', '.join(exprs)} FROM {table} WHERE time_stamp IS NOT NULL "
+                                      f"ORDER BY time_stamp")
+                while True:
+                    batch = rows.fetchmany(chunk_rows)
+                    if not batch:
+                        break
+                    with self.write_lock:
+                        self._write_rows([(table, row) for row in batch])
+                    imported += len(batch)
+        finally:
+            source.close()
+        print(f"🗄️ Imported {imported} rows from {path}")
+        return imported
@@ -0,0 +1,202 @@
+import os
+from collections import namedtuple
+import cv2
+import numpy as np
+
+# Columnar detections for one frame: xyxy (N,4) float32, conf (N,) float32, cls (N,) int
+Detections = namedtuple('Detections', ['xyxy', 'conf', 'cls'])
+
+
+def empty_detections():
+    return Detections(np.empty((0, 4), dtype=np.float32),
+                      np.empty((0,), dtype=np.float32),
+                      np.empty((0,), dtype=int))
+
+
+class UltralyticsDetector:
+    """Runs the .pt weights through ultralytics YOLO.predict"""
+    name = 'ultralytics'
+
+    def __init__(self, model_cfg):
+        from ultralytics import YOLO  # pulls in torch, so only import when this backend is chosen
+        self.model = YOLO(model_cfg['path'])
+        self.conf_threshold = model_cfg['conf_threshold']
+
+    def predict(self, frames):
+        results = self.model.predict(source=list(frames), conf=self.conf_threshold, verbose=False)
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            detections.append(Detections(boxes.xyxy.cpu().numpy().astype(np.float32),
+                                         boxes.conf.cpu().numpy().astype(np.float32),
+                                         boxes.cls.cpu().numpy().astype(int)))
+        return detections
+
+
+class OnnxRuntimeDetector:
+    """
+    Runs an exported YOLOv8 .onnx model with ONNX Runtime on CPU.
+    Letterboxing, box decoding and NMS are done here with NumPy/OpenCV, no torch needed.
+    List 'OpenVINOExecutionProvider' first in onnx_providers to run through OpenVINO.
+    """
+    name = 'onnxruntime'
+
+    def __init__(self, model_cfg):
+        import onnxruntime as ort
+        onnx_path = model_cfg.get('onnx_path') or os.path.splitext(model_cfg['path'])[0] + '.onnx'
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"{onnx_path} not found, export it first with detectors.export_onnx()")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options,
+                                            providers=model_cfg.get('onnx_providers', ['CPUExecutionProvider']))
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports pin batch to 1; dynamic ones accept the whole camera batch at once
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        height, width = model_input.shape[2:4]
+        imgsz = model_cfg.get('imgsz', 640)
+        self.input_size = (height if isinstance(height, int) else imgsz,
+                           width if isinstance(width, int) else imgsz)
+        self.conf_threshold = model_cfg['conf_threshold']
+        self.iou_threshold = model_cfg.get('iou_threshold', 0.7)
+        self.max_det = model_cfg.get('max_det', 300)
+
+    def letterbox(self, frame):
+        """Resize keeping aspect ratio and pad to the model input size, returns (image, gain, (pad_x, pad_y))"""
+        in_h, in_w = self.input_size
+        h, w = frame.shape[:2]
+        gain = min(in_h / h, in_w / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        pad_x, pad_y = (in_w - new_w) / 2, (in_h - new_h) / 2
+
+        if (new_w, new_h) != (w, h):
+            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+        left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+        frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return frame, gain, (left, top)
+
+    def preprocess(self, frames):
+        images, metas = [], []
+        for frame in frames:
+            image, gain, pad = self.letterbox(frame)
+            images.append(image)
+            metas.append((gain, pad, frame.shape[:2]))
+        # BGR HWC uint8 -> RGB NCHW float32 in [0, 1]
+        blob = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, metas
+
+    def decode(self, output, gain, pad, shape):
+        """Turns one (4 + num_classes, anchors) YOLOv8 output into Detections in frame pixels"""
+        preds = output.T
+        class_scores = preds[:, 4:]
+        cls = class_scores.argmax(1)
+        conf = class_scores[np.arange(len(cls)), cls]
+        keep = conf > self.conf_threshold
+        if not keep.any():
+            return empty_detections()
+
+        boxes, conf, cls = preds[keep, :4], conf[keep], cls[keep]
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+
+        # Offset boxes per class so a single NMS pass never suppresses across classes
+        offset = (cls * 7680)[:, None].astype(np.float32)
+        nms_boxes = np.concatenate([xyxy[:, :2] + offset, boxes[:, 2:]], axis=1)
+        idx = cv2.dnn.NMSBoxes(nms_boxes, conf, self.conf_threshold, self.iou_threshold, top_k=self.max_det)
+        idx = np.asarray(idx, dtype=int).reshape(-1)
+
+        xyxy = xyxy[idx]
+        xyxy[:, [0, 2]] -= pad[0]
+        xyxy[:, [1, 3]] -= pad[1]
+        xyxy /= gain
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+        return Detections(xyxy.astype(np.float32), conf[idx].astype(np.float32), cls[idx].astype(int))
+
+    def predict(self, frames):
+        blob, metas = self.preprocess(frames)
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: blob[i:i + 1]})[0]
+                                      for i in range(len(blob))])
+        return [self.decode(output, *meta) for output, meta in zip(outputs, metas)]
+
+
+BACKENDS = {
+    UltralyticsDetector.name: UltralyticsDetector,
+    OnnxRuntimeDetector.name: OnnxRuntimeDetector,
+}
+
+
+def create_detector(model_cfg):
+    backend = model_cfg.get('backend', UltralyticsDetector.name)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](model_cfg)
+
+
+def export_onnx(model_cfg):
+    """Exports the .pt weights next to themselves as .onnx with a dynamic batch dimension"""
+    from ultralytics import YOLO
+    return YOLO(model_cfg['path']).export(format='onnx', imgsz=model_cfg.get('imgsz', 640), dynamic=True)
+
+
+def crop_roi(frame, coords):
+    """Clips [x1, y1, x2, y2] to the frame and returns (crop view, clipped roi)"""
+    h, w = frame.shape[:2]
+    x1, y1 = max(0, int(coords[0])), max(0, int(coords[1]))
+    x2, y2 = min(w, int(coords[2])), min(h, int(coords[3]))
+    return frame[y1:y2, x1:x2], (x1, y1, x2, y2)
+
+
+def uncrop_detections(detections, roi, frame_shape):
+    """
+    Maps Detections predicted on a crop_roi() crop back to frame pixels.
+    Boxes clipped by a crop edge that is not also a frame edge are dropped, since on the
+    full frame they would have crossed the ROI and been filtered out anyway.
+    """
+    x1, y1, x2, y2 = roi
+    h, w = frame_shape[:2]
+    xyxy = detections.xyxy + np.array([x1, y1, x1, y1], dtype=np.float32)
+
+    keep = np.ones(len(xyxy), dtype=bool)
+    if x1 > 0:
+        keep &= xyxy[:, 0] > x1
+    if y1 > 0:
+        keep &= xyxy[:, 1] > y1
+    if x2 < w:
+        keep &= xyxy[:, 2] < x2
+    if y2 < h:
+        keep &= xyxy[:, 3] < y2
+    return Detections(xyxy[keep], detections.conf[keep], detections.cls[keep])
+
+
+def predict_rois(detector, frames, rois):
+    """Predicts on each frame's crop_roi() crop and returns Detections in full-frame pixels"""
+    crops = [crop_roi(frame, coords) for frame, coords in zip(frames, rois)]
+    results = detector.predict([crop for crop, _ in crops])
+    return [uncrop_detections(result, roi, frame.shape)
+            for result, (_, roi), frame in zip(results, crops, frames)]
+
+
+def filter_detections(detections, coords, max_det):
+    """
+    Applies the conveyor ROI, area and top-K cap to a whole frame of Detections at once.
+    Returns columnar (boxes int (N,4), conf (N,), cls (N,), areas int (N,)).
+    """
+    boxes = detections.xyxy.astype(int)
+    inside = ((boxes[:, 0] >= coords[0]) & (boxes[:, 2] <= coords[2]) &
+              (boxes[:, 1] >= coords[1]) & (boxes[:, 3] <= coords[3]))
+    boxes, conf, cls = boxes[inside], detections.conf[inside], detections.cls[inside]
+
+    if len(conf) > max_det:
+        keep = np.sort(np.argpartition(-conf, max_det - 1)[:max_det])
+        boxes, conf, cls = boxes[keep], conf[keep], cls[keep]
+
+    areas = ((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])) // 1820
+    return boxes, conf, cls, areas
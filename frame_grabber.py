@@ -0,0 +1,115 @@
+import time
+import cv2
+from threading import Thread, Lock, Condition
+
+
+def open_camera(cam_cfg):
+    """Opens and configures the capture device described by one CONFIG['cameras'] entry"""
+    port = cam_cfg['port']
+    if port == 1:
+        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+    else:
+        cap = cv2.VideoCapture(port, cv2.CAP_DSHOW)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, cam_cfg['width'])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, cam_cfg['height'])
+    cap.set(cv2.CAP_PROP_FPS, 30)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+    return cap
+
+
+class FrameSignal:
+    """Counts frames put into any of several LatestFrameBuffers, so one loop can wait on all cameras at once"""
+
+    def __init__(self):
+        self.cond = Condition()
+        self.count = 0
+
+    def notify(self):
+        with self.cond:
+            self.count += 1
+            self.cond.notify_all()
+
+    def wait(self, seen, timeout=None):
+        """Waits until a frame arrives after count was `seen`, at most timeout seconds"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.count != seen, timeout)
+
+
+class LatestFrameBuffer:
+    """One-slot buffer holding only the newest captured frame and its capture time"""
+
+    def __init__(self, signal=None):
+        self.signal = signal  # optional FrameSignal shared with other cameras' buffers
+        self.lock = Lock()
+        self.cond = Condition(self.lock)
+        self.frame = None
+        self.timestamp = 0.0
+        self.seq = 0  # frames written by the capture thread
+        self.read_seq = 0  # last frame handed to the processing loop
+        self.skipped = 0  # frames overwritten before anyone read them
+
+    def put(self, frame, timestamp):
+        with self.cond:
+            self.frame = frame
+            self.timestamp = timestamp
+            self.seq += 1
+            self.cond.notify_all()
+        if self.signal:
+            self.signal.notify()
+
+    def get(self, timeout=None):
+        """
+        Returns (frame, timestamp, skipped) for the newest frame not yet read.
+        skipped is the number of frames dropped since the previous get().
+        Returns (None, 0.0, 0) if no new frame arrived within timeout.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > self.read_seq, timeout):
+                return None, 0.0, 0
+            skipped = self.seq - self.read_seq - 1
+            self.read_seq = self.seq
+            self.skipped += skipped
+            return self.frame, self.timestamp, skipped
+
+
+class CameraCaptureThread(Thread):
+    """Reads a cv2.VideoCapture as fast as it delivers and publishes into a LatestFrameBuffer"""
+
+    def __init__(self, cap, name, flip=False, max_failures=30, signal=None):
+        super().__init__(name=f"capture-{name}", daemon=True)
+        self.cap = cap
+        self.flip = flip
+        self.max_failures = max_failures
+        self.buffer = LatestFrameBuffer(signal)
+        self.running = False
+        self.connected = True
+        self.frames_captured = 0
+
+    def run(self):
+        self.running = True
+        failures = 0
+        while self.running:
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+            if not ret:
+                failures += 1
+                if failures >= self.max_failures:
+                    self.connected = False
+                time.sleep(0.01)
+                continue
+
+            failures = 0
+            self.connected = True
+            if self.flip:
+                frame = cv2.flip(frame, 1)
+            self.frames_captured += 1
+            self.buffer.put(frame, timestamp)
+
+    def read_latest(self, timeout=None):
+        return self.buffer.get(timeout)
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=timeout)
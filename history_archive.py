@@ -0,0 +1,225 @@
+"""
+Columnar archive of closed DataStore partitions, for historical analysis without SQLite or pandas.
+
+Each archived partition is a folder of raw .npy column files, one per table column, sorted by
+time stamp: time stamps as datetime64[us], measurements as float64, ids as int64 and text columns
+(motor_class, load_type, status) as int16 codes into a category list. manifest.json lists the
+partitions with their days, row counts and categories.
+
+HistoryArchive memory-maps the columns, so a range scan binary-searches the time stamps and
+reads only the rows it returns, and aggregations run over those slices with NumPy.
+
+    python history_archive.py --db data_file_4.db --archive-dir history_archive
+    python history_archive.py --archive-dir history_archive --summary seg_belt --start 2026-09-01 --end 2026-09-30
+"""
+import json
+import os
+import shutil
+import sqlite3
+import numpy as np
+
+TABLES = {
+    # table: {column: kind}, kind is 'time', 'id', 'value' or 'category'
+    'storeHouse': {'id': 'id', 'time_stamp': 'time', 'speed': 'value', 'objects': 'value', 'area': 'value',
+                   'motor_class': 'category'},
+    'load_data': {'id': 'id', 'time_stamp': 'time', 'load_type': 'category', 'weight': 'value',
+                  'status': 'category'},
+}
+# The column each table is usually filtered on
+KEYS = {'storeHouse': 'motor_class', 'load_data': 'load_type'}
+BUCKETS = {'Minute': 'datetime64[m]', 'Hour': 'datetime64[h]', 'Day': 'datetime64[D]'}
+
+
+def _load_manifest(directory):
+    path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(path):
+        return {'partitions': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, 'manifest.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def archive_partition(partition_path, name, first_day, last_day, directory):
+    """
+    Writes the storeHouse/load_data rows of one partition file as column files under
+    directory/name and records it in the manifest. The partition file is only read.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tmp_dir = os.path.join(directory, name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    entry = {'first_day': first_day, 'last_day': last_day, 'tables': {}}
+    source = sqlite3.connect(f"file:{partition_path}?mode=ro", uri=True)
+    for table, columns in TABLES.items():
+        exprs = [f"COALESCE({column}, '')" if kind == 'category' else column for column, kind in columns.items()]
+        rows = source.execute(f"SELECT {', '.join(exprs)} FROM {table} WHERE time_stamp IS NOT NULL "
+                              f"ORDER BY time_stamp").fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        info = {'rows': len(rows), 'categories': {}}
+        for (column, kind), data in zip(columns.items(), values):
+            if kind == 'time':
+                array = np.array(data, dtype='datetime64[us]')
+            elif kind == 'id':
+                array = np.array(data, dtype=np.int64)
+            elif kind == 'value':
+                array = np.array(data, dtype=np.float64)
+            else:
+                categories, array = np.unique(np.array(data, dtype=str), return_inverse=True)
+                array = array.astype(np.int16)
+                info['categories'][column] = categories.tolist()
+            np.save(os.path.join(tmp_dir, f"{table}.{column}.npy"), array)
+        entry['tables'][table] = info
+    source.close()
+
+    final_dir = os.path.join(directory, name)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    manifest = _load_manifest(directory)
+    manifest['partitions'][name] = entry
+    _save_manifest(directory, manifest)
+    return entry
+
+
+def archive_closed_partitions(db_path, directory, before=None):
+    """
+    Archives every partition listed in db_path's catalog whose last day is before `before`
+    ('YYYY-MM-DD', default today) and which isn't in the archive yet. Returns their names.
+    """
+    before = before or np.datetime64('today', 'D').astype(str)
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    partitions = connection.execute("SELECT name, path, first_day, last_day FROM partitions WHERE last_day < ? "
+                                    "ORDER BY first_day", [before]).fetchall()
+    connection.close()
+    archived = _load_manifest(directory)['partitions']
+    names = []
+    for name, path, first_day, last_day in partitions:
+        if name in archived:
+            continue
+        archive_partition(os.path.join(os.path.dirname(os.path.abspath(db_path)), path), name, first_day,
+                          last_day, directory)
+        print(f"📦 Archived partition {name} to {directory}")
+        names.append(name)
+    return names
+
+
+class HistoryArchive:
+    """Memory-mapped reader over an archive written by archive_partition"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.refresh()
+
+    def refresh(self):
+        """Re-reads the manifest, e.g. after more partitions were archived"""
+        self.manifest = _load_manifest(self.directory)
+        self.maps = {}
+
+    def partitions(self, start=None, end=None):
+        """Archived partition names holding any day between start and end ('YYYY-MM-DD...', None = open)"""
+        start, end = (start or '0000-00-00')[:10], (end or '9999-12-31')[:10]
+        return sorted(name for name, entry in self.manifest['partitions'].items()
+                      if entry['last_day'] >= start and entry['first_day'] <= end)
+
+    def column(self, name, table, column):
+        """One partition's column as a read-only memory map"""
+        key = (name, table, column)
+        if key not in self.maps:
+            self.maps[key] = np.load(os.path.join(self.directory, name, f"{table}.{column}.npy"), mmap_mode='r')
+        return self.maps[key]
+
+    def scan(self, table, start=None, end=None, columns=None, key=None):
+        """
+        {column: array} of table's rows with start <= time_stamp < end, oldest first. start/end
+        are anything np.datetime64 accepts ('2026-09-01', '2026-09-01 12:00'); key keeps only the
+        rows whose motor_class/load_type equals it. Category columns come back as codes into
+        categories(). Unfiltered scans within one partition return views of the memory maps.
+        """
+        columns = columns or list(TABLES[table])
+        start = np.datetime64(start, 'us') if start else None
+        end = np.datetime64(end, 'us') if end else None
+        pieces = {column: [] for column in columns}
+        for name in self.partitions(start and str(start), end and str(end - np.timedelta64(1, 'us'))):
+            info = self.manifest['partitions'][name]['tables'][table]
+            if not info['rows']:
+                continue
+            stamps = self.column(name, table, 'time_stamp')
+            lo = np.searchsorted(stamps, start) if start is not None else 0
+            hi = np.searchsorted(stamps, end) if end is not None else len(stamps)
+            if lo >= hi:
+                continue
+            mask = None
+            if key is not None:
+                categories = info['categories'][KEYS[table]]
+                if key not in categories:
+                    continue
+                mask = self.column(name, table, KEYS[table])[lo:hi] == categories.index(key)
+            for column in columns:
+                data = self.column(name, table, column)[lo:hi]
+                if TABLES[table][column] == 'category':
+                    # Codes are per partition; map them onto the archive-wide category list
+                    lookup = np.searchsorted(self.categories(table, column), info['categories'][column])
+                    data = lookup.astype(np.int16)[data]
+                pieces[column].append(data if mask is None else data[mask])
+        return {column: (parts[0] if len(parts) == 1 else np.concatenate(parts) if parts
+                         else np.empty(0, dtype=self._dtype(table, column)))
+                for column, parts in pieces.items()}
+
+    def categories(self, table, column):
+        """Sorted category list the codes scan() returns for a category column index into"""
+        return sorted({category for entry in self.manifest['partitions'].values()
+                       for category in entry['tables'][table]['categories'].get(column, [])})
+
+    def aggregate(self, table, value, every='Day', start=None, end=None, key=None):
+        """
+        Per-bucket count, mean, min and max of one value column over a range scan, with every
+        'Minute', 'Hour' or 'Day'. Returns {'bucket': datetime64 array, 'count', 'mean', 'min', 'max'}.
+        """
+        rows = self.scan(table, start, end, ['time_stamp', value], key)
+        buckets = rows['time_stamp'].astype(BUCKETS[every])
+        values = np.asarray(rows[value], dtype=np.float64)
+        if not len(values):
+            empty = np.empty(0)
+            return {'bucket': buckets, 'count': empty.astype(np.int64), 'mean': empty, 'min': empty, 'max': empty}
+        # Rows are sorted by time, so each bucket is one contiguous run
+        starts = np.concatenate([[0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1])
+        counts = np.diff(np.append(starts, len(values)))
+        return {
+            'bucket': buckets[starts],
+            'count': counts,
+            'mean': np.add.reduceat(values, starts) / counts,
+            'min': np.minimum.reduceat(values, starts),
+            'max': np.maximum.reduceat(values, starts),
+        }
+
+    def _dtype(self, table, column):
+        kind = TABLES[table][column]
+        return {'time': 'datetime64[us]', 'id': np.int64, 'value': np.float64, 'category': np.int16}[kind]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Columnar archive of closed DataStore partitions')
+    parser.add_argument('--db', default=None, help='Archive the closed partitions of this database')
+    parser.add_argument('--archive-dir', default='history_archive', help='Archive folder [history_archive]')
+    parser.add_argument('--summary', default=None, help='Print daily averages for this belt from the archive')
+    parser.add_argument('--start', default=None, help='Summary start date (YYYY-MM-DD)')
+    parser.add_argument('--end', default=None, help='Summary end date, exclusive (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    if args.db:
+        archived = archive_closed_partitions(args.db, args.archive_dir)
+        print(f"📦 {len(archived)} partitions archived")
+    if args.summary:
+        archive = HistoryArchive(args.archive_dir)
+        daily = archive.aggregate('storeHouse', 'speed', 'Day', args.start, args.end, key=args.summary)
+        for bucket, count, mean, low, high in zip(daily['bucket'], daily['count'], daily['mean'], daily['min'],
+                                                  daily['max']):
+            print(f"{bucket}  {count:>7} rows  speed avg {mean:8.2f}  min {low:8.2f}  max {high:8.2f}")
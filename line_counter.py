@@ -0,0 +1,131 @@
+import time
+import numpy as np
+
+
+class LineCrossingCounter:
+    """
+    Counts tracks whose centre crosses a counting line, once per track id, with per-class totals
+    and an objects-per-minute rate over a sliding window.
+
+    State stays bounded for long runs: a track's entry is dropped once it has not been seen for
+    max_idle frames (SORT never reuses ids), and the rate is kept in fixed one-second bins.
+    """
+
+    def __init__(self, line_coords, classes, window=60, max_idle=40, match_iou=0.3):
+        x1, y1, x2, y2 = line_coords
+        self.origin = np.array([x1, y1], dtype=float)
+        self.direction = np.array([x2 - x1, y2 - y1], dtype=float)
+        self.length_sq = max(float(self.direction @ self.direction), 1e-9)
+        self.classes = classes
+        self.window = window
+        self.max_idle = max_idle
+        self.match_iou = match_iou
+
+        self.tracks = {}  # id -> [side, last_seen_frame, cls, counted]
+        self.frame_count = 0
+        self.total = 0
+        self.class_totals = dict.fromkeys(classes, 0)
+        self.bins = np.zeros(window, dtype=np.int64)
+        self.bin_seconds = np.full(window, -1, dtype=np.int64)
+
+    def update(self, tracks, boxes=None, cls=None, timestamp=None):
+        """
+        tracks: SORT output rows [x1, y1, x2, y2, id]. boxes/cls are this frame's detections,
+        used to label tracks with a class. Returns the number of tracks that crossed this frame.
+        """
+        self.frame_count += 1
+        timestamp = time.time() if timestamp is None else timestamp
+        crossed = 0
+        if len(tracks):
+            tracks = np.asarray(tracks, dtype=float)
+            centres = (tracks[:, :2] + tracks[:, 2:4]) / 2
+            offsets = centres - self.origin
+            sides = np.sign(self.direction[0] * offsets[:, 1] - self.direction[1] * offsets[:, 0])
+            along = (offsets @ self.direction) / self.length_sq
+            labels = self._match_classes(tracks, boxes, cls)
+
+            for obj_id, side, t, label in zip(tracks[:, 4].astype(int).tolist(), sides.tolist(), along.tolist(),
+                                              labels.tolist()):
+                state = self.tracks.get(obj_id)
+                if state is None:
+                    self.tracks[obj_id] = [side, self.frame_count, label, False]
+                    continue
+                state[1] = self.frame_count
+                if label >= 0:
+                    state[2] = label
+                if side == 0:
+                    continue  # on the line, wait for it to come off one side
+                if state[0] != 0 and side != state[0] and 0 <= t <= 1 and not state[3]:
+                    state[3] = True
+                    self._count(state[2], timestamp)
+                    crossed += 1
+                state[0] = side
+
+        self._evict()
+        return crossed
+
+    def rate(self, now=None):
+        """Crossings per minute over the last window seconds"""
+        second = int(time.time() if now is None else now)
+        recent = self.bin_seconds > second - self.window
+        return float(self.bins[recent].sum()) * 60.0 / self.window
+
+    def snapshot(self):
+        """Counter state as a dict of arrays (see track_snapshot)"""
+        return {
+            'ids': np.fromiter(self.tracks.keys(), dtype=np.int64, count=len(self.tracks)),
+            'tracks': np.array(list(self.tracks.values()), dtype=float).reshape(-1, 4),
+            'frame_count': np.array(self.frame_count),
+            'total': np.array(self.total),
+            'class_totals': np.array([self.class_totals[name] for name in self.classes]),
+            'bins': self.bins,
+            'bin_seconds': self.bin_seconds,
+        }
+
+    def restore(self, state):
+        self.tracks = {obj_id: [side, int(last_seen), int(label), bool(counted)]
+                       for obj_id, (side, last_seen, label, counted) in zip(state['ids'].tolist(),
+                                                                            state['tracks'].tolist())}
+        self.frame_count = int(state['frame_count'])
+        self.total = int(state['total'])
+        if len(state['class_totals']) == len(self.classes):
+            self.class_totals = dict(zip(self.classes, state['class_totals'].tolist()))
+        if len(state['bins']) == self.window:
+            self.bins = state['bins'].copy()
+            self.bin_seconds = state['bin_seconds'].copy()
+
+    def _match_classes(self, tracks, boxes, cls):
+        """Class of the best-overlapping detection for each track, -1 where none overlaps enough"""
+        labels = np.full(len(tracks), -1, dtype=int)
+        if boxes is None or cls is None or len(boxes) == 0:
+            return labels
+        boxes = np.asarray(boxes, dtype=float)
+        xx1 = np.maximum(tracks[:, None, 0], boxes[None, :, 0])
+        yy1 = np.maximum(tracks[:, None, 1], boxes[None, :, 1])
+        xx2 = np.minimum(tracks[:, None, 2], boxes[None, :, 2])
+        yy2 = np.minimum(tracks[:, None, 3], boxes[None, :, 3])
+        inter = np.maximum(0., xx2 - xx1) * np.maximum(0., yy2 - yy1)
+        track_area = (tracks[:, 2] - tracks[:, 0]) * (tracks[:, 3] - tracks[:, 1])
+        box_area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        iou = inter / np.maximum(track_area[:, None] + box_area[None, :] - inter, 1e-9)
+        best = iou.argmax(axis=1)
+        matched = iou[np.arange(len(tracks)), best] >= self.match_iou
+        labels[matched] = np.asarray(cls)[best[matched]]
+        return labels
+
+    def _count(self, label, timestamp):
+        self.total += 1
+        if 0 <= label < len(self.classes):
+            self.class_totals[self.classes[label]] += 1
+        second = int(timestamp)
+        slot = second % self.window
+        if self.bin_seconds[slot] != second:
+            self.bin_seconds[slot] = second
+            self.bins[slot] = 0
+        self.bins[slot] += 1
+
+    def _evict(self):
+        oldest = self.frame_count - self.max_idle
+        stale = [obj_id for obj_id, state in self.tracks.items() if state[1] < oldest]
+        for obj_id in stale:
+            del self.tracks[obj_id]
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+from detectors import crop_roi
+
+
+class MotionGate:
+    """
+    Decides whether a frame is worth running the detector on.
+
+    Compares a small grayscale copy of the conveyor ROI with the copy taken at the last
+    inference; inference runs when enough pixels changed or after max_skip skipped frames.
+    """
+
+    def __init__(self, coords, gate_cfg):
+        self.coords = coords
+        self.enabled = gate_cfg['enabled']
+        self.downscale = gate_cfg['downscale']
+        self.pixel_threshold = gate_cfg['pixel_threshold']
+        self.change_ratio = gate_cfg['change_ratio']
+        self.max_skip = gate_cfg['max_skip']
+        self.reference = None
+        self.skipped_in_row = 0
+        self.frames_seen = 0
+        self.frames_skipped = 0
+
+    def thumbnail(self, frame):
+        roi, _ = crop_roi(frame, self.coords)
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def should_infer(self, frame):
+        self.frames_seen += 1
+        if not self.enabled:
+            return True
+
+        small = self.thumbnail(frame)
+        if self.reference is not None and self.skipped_in_row < self.max_skip:
+            diff = cv2.absdiff(small, self.reference)
+            changed = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+            if changed < self.change_ratio:
+                self.skipped_in_row += 1
+                self.frames_skipped += 1
+                return False
+
+        self.reference = small
+        self.skipped_in_row = 0
+        return True
+
+    @property
+    def skip_ratio(self):
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
+
+
+class BeltMotionPrior:
+    """
+    Converts a belt's motor speed into the image shift the tracker should expect per frame, using
+    a per-camera pixels_per_step calibration, and spaces inference out to every detect_every-th
+    frame while tracks follow the belt in between.
+    """
+
+    def __init__(self, belt_cfg, tracking_cfg):
+        self.motor = belt_cfg['motor']
+        self.pixels_per_step = np.asarray(belt_cfg['pixels_per_step'], dtype=float)
+        self.detect_every = max(1, tracking_cfg['detect_every'])
+        self.velocity_var = tracking_cfg['velocity_var']
+        self.last_time = None
+        self.frames_since_detect = self.detect_every
+
+    def velocity(self, motor_speed, timestamp):
+        """(dx, dy) in pixels since the previous call for a belt at motor_speed steps/s, None on the first call"""
+        last, self.last_time = self.last_time, timestamp
+        if last is None:
+            return None
+        # Cap the interval so a stalled loop doesn't throw every track off the belt
+        return self.pixels_per_step * motor_speed * min(timestamp - last, 1.0)
+
+    def should_infer(self):
+        if self.frames_since_detect >= self.detect_every:
+            self.frames_since_detect = 1
+            return True
+        self.frames_since_detect += 1
+        return False
@@ -0,0 +1,108 @@
+import time
+import cv2
+from threading import Thread, Condition
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MjpegRenderer(Thread):
+    """
+    Builds overlays from the latest results at a capped rate and serves them as MJPEG over HTTP.
+
+    render_fn(frame_idx) must return an annotated copy of that camera's latest frame, or None.
+    Nothing is rendered while no client is connected.
+    """
+
+    def __init__(self, render_fn, names, max_fps=5, host='127.0.0.1', port=8090, jpeg_quality=70):
+        super().__init__(name="mjpeg-renderer", daemon=True)
+        self.render_fn = render_fn
+        self.names = names
+        self.interval = 1.0 / max_fps
+        self.jpeg_quality = jpeg_quality
+        self.cond = Condition()
+        self.jpegs = [None] * len(names)
+        self.versions = [0] * len(names)
+        self.clients = 0
+        self.running = False
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.server_thread = Thread(target=self.server.serve_forever, name="mjpeg-http", daemon=True)
+
+    def run(self):
+        self.running = True
+        self.server_thread.start()
+        print(f"📺 MJPEG stream on http://{self.server.server_address[0]}:{self.server.server_address[1]}/")
+        while self.running:
+            started = time.time()
+            if self.clients:
+                for i in range(len(self.names)):
+                    frame = self.render_fn(i)
+                    if frame is None:
+                        continue
+                    ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                    if ok:
+                        with self.cond:
+                            self.jpegs[i] = jpeg.tobytes()
+                            self.versions[i] += 1
+                            self.cond.notify_all()
+            time.sleep(max(0.0, self.interval - (time.time() - started)))
+
+    def stop(self):
+        self.running = False
+        self.server.shutdown()
+        self.server.server_close()
+        with self.cond:
+            self.cond.notify_all()
+
+    def _make_handler(self):
+        renderer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path in ('/', '/index.html'):
+                    images = ''.join(f'<h3>{name}</h3><img src="/camera/{i}">'
+                                     for i, name in enumerate(renderer.names))
+                    body = f'<html><body>{images}</body></html>'.encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                try:
+                    frame_idx = int(self.path.rsplit('/', 1)[-1])
+                    renderer.names[frame_idx]
+                except (ValueError, IndexError):
+                    self.send_error(404)
+                    return
+                self.stream(frame_idx)
+
+            def stream(self, frame_idx):
+                self.send_response(200)
+                self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+                self.end_headers()
+                with renderer.cond:
+                    renderer.clients += 1
+                seen = -1
+                try:
+                    while renderer.running:
+                        with renderer.cond:
+                            renderer.cond.wait_for(lambda: renderer.versions[frame_idx] != seen or not renderer.running,
+                                                   timeout=1.0)
+                            jpeg, seen = renderer.jpegs[frame_idx], renderer.versions[frame_idx]
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\n')
+                        self.wfile.write(f'Content-Length: {len(jpeg)}\r\n\r\n'.encode('ascii'))
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b'\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with renderer.cond:
+                        renderer.clients -= 1
+
+        return Handler
@@ -0,0 +1,238 @@
+"""
+Offline replay of UnifiedMotorSystem on recorded footage, without cameras or an Arduino.
+
+Each camera in CONFIG['cameras'] is fed from a video file or an image folder (given in the same
+order). Motor commands and dashboard rows are recorded instead of being sent, then printed with
+the achieved throughput.
+
+    python replay.py --source seg_belt.mp4 --source pickup_frames/
+    python replay.py --source seg_belt.mp4 --source pickup.mp4 --realtime --display
+
+Note: as-fast-as-possible replay still runs the speed controller's delays and the pickup belt
+movement time on the wall clock, so those span more frames than they would live. Use --realtime
+for control behaviour that matches the line.
+"""
+import argparse
+import datetime
+import glob
+import os
+import time
+import cv2
+from frame_grabber import CameraCaptureThread
+from unified_motor_control import CONFIG, UnifiedMotorSystem
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in reading a video file or an image folder, optionally paced to real time"""
+
+    def __init__(self, source, fps=30, realtime=False):
+        self.source = source
+        self.images = None
+        self.video = None
+        if os.path.isdir(source):
+            self.images = sorted(path for pattern in IMAGE_EXTENSIONS for path in glob.glob(os.path.join(source, pattern)))
+            self.position = 0
+        else:
+            self.video = cv2.VideoCapture(source)
+            fps = self.video.get(cv2.CAP_PROP_FPS) or fps
+        self.interval = 1.0 / fps
+        self.realtime = realtime
+        self.next_frame_time = None
+        self.exhausted = False
+
+    def isOpened(self):
+        if self.images is not None:
+            return len(self.images) > 0
+        return self.video.isOpened()
+
+    def read(self):
+        if self.realtime:
+            now = time.time()
+            if self.next_frame_time is None:
+                self.next_frame_time = now
+            elif now < self.next_frame_time:
+                time.sleep(self.next_frame_time - now)
+            self.next_frame_time += self.interval
+
+        frame = None
+        if self.images is not None:
+            if self.position < len(self.images):
+                frame = cv2.imread(self.images[self.position])
+                self.position += 1
+        else:
+            ret, frame = self.video.read()
+            if not ret:
+                frame = None
+
+        if frame is None:
+            self.exhausted = True
+            return False, None
+        return True, frame
+
+    def set(self, prop_id, value):
+        return False
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+
+
+class SynchronousGrabber:
+    """CameraCaptureThread interface that hands out every frame in order, for as-fast-as-possible replay"""
+
+    def __init__(self, cap, flip=False):
+        self.cap = cap
+        self.flip = flip
+        self.connected = True
+        self.frames_captured = 0
+
+    def start(self):
+        pass
+
+    def stop(self, timeout=1.0):
+        pass
+
+    def read_latest(self, timeout=None):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None, 0.0, 0
+        if self.flip:
+            frame = cv2.flip(frame, 1)
+        self.frames_captured += 1
+        return frame, time.time(), 0
+
+
+class ReplaySession:
+    """Opens one replay source per camera for UnifiedMotorSystem.initialize_cameras()"""
+
+    def __init__(self, sources, realtime=False, fps=30):
+        self.sources = sources
+        self.realtime = realtime
+        self.fps = fps
+        self.captures = []
+        self.grabbers = []
+
+    def open(self, frame_idx, cam_cfg, signal=None):
+        cap = ReplayCapture(self.sources[frame_idx], fps=self.fps, realtime=self.realtime)
+        self.captures.append(cap)
+        if self.realtime:
+            # Live pacing keeps the latest-frame behaviour, including dropped frames under load
+            grabber = CameraCaptureThread(cap, cam_cfg['name'], flip=cam_cfg['flip'], max_failures=float('inf'),
+                                          signal=signal)
+        else:
+            grabber = SynchronousGrabber(cap, flip=cam_cfg['flip'])
+        self.grabbers.append(grabber)
+        return cap, grabber
+
+    def finished(self):
+        """True once every source is exhausted and its last frame has been handed out"""
+        if not self.captures:
+            return False
+        for cap, grabber in zip(self.captures, self.grabbers):
+            if not cap.exhausted:
+                return False
+            buffer = getattr(grabber, 'buffer', None)
+            if buffer is not None and buffer.seq != buffer.read_seq:
+                return False
+        return True
+
+
+class RecordingController:
+    """Stand-in for ConveyorSystemController that records motor commands instead of writing to serial"""
+
+    def __init__(self, load_cell_value=0.0):
+        self.motor_speeds = {'motor1': 0, 'motor2': 0}
+        self.load_cell_value = load_cell_value
+        self.commands = []
+        self.start_time = time.time()
+
+    def set_motor_speeds(self, motor1_speed, motor2_speed):
+        motor1_speed = max(-1000, min(1000, motor1_speed))
+        motor2_speed = max(-1000, min(1000, motor2_speed))
+        self.commands.append((time.time() - self.start_time, motor1_speed, motor2_speed))
+        # The Arduino would ACK with the speeds it applied
+        self.motor_speeds['motor1'] = int(motor1_speed)
+        self.motor_speeds['motor2'] = int(motor2_speed)
+        return True
+
+    def get_load_cell_value(self):
+        return self.load_cell_value
+
+    def tare_load_cell(self):
+        return True
+
+    def calibrate_load_cell(self, known_mass):
+        return known_mass > 0
+
+    def stop_motors(self):
+        return self.set_motor_speeds(0, 0)
+
+    def close(self):
+        pass
+
+
+class RecordingDataStore:
+    """Collects the dashboard rows UnifiedMotorSystem would have written"""
+
+    def __init__(self):
+        self.rows = []
+        self.load_rows = []
+
+    def add_data(self, speed, objects, area, motor_class):
+        self.rows.append((datetime.datetime.now(), speed, objects, area, motor_class))
+
+    def add_load_data(self, load_type, weight, status="normal"):
+        self.load_rows.append((datetime.datetime.now(), load_type, weight, status))
+
+    def close(self):
+        pass
+
+
+def print_report(system, controller, store, elapsed):
+    print("\n📊 Replay results")
+    total = 0
+    for i, grabber in enumerate(system.grabbers):
+        processed = grabber.frames_captured - system.frames_skipped[i]
+        total += processed
+        print(f"  {CONFIG['cameras'][i]['name']}: {processed} frames processed, "
+              f"{system.frames_skipped[i]} skipped, {processed / elapsed:.1f} FPS")
+    print(f"  Total: {total} frames in {elapsed:.2f}s, {total / elapsed:.1f} FPS")
+
+    print(f"\n⚙️ Speed commands ({len(controller.commands)})")
+    for t, motor1_speed, motor2_speed in controller.commands:
+        print(f"  {t:8.2f}s  motor1={motor1_speed}  motor2={motor2_speed}")
+
+    print(f"\n🗄️ Dashboard rows ({len(store.rows)} storeHouse, {len(store.load_rows)} load_data)")
+    for row in store.rows:
+        print(f"  storeHouse {row[0]:%H:%M:%S.%f}  speed={row[1]}  objects={row[2]}  area={row[3]}  {row[4]}")
+    for row in store.load_rows:
+        print(f"  load_data  {row[0]:%H:%M:%S.%f}  {row[1]}  weight={row[2]}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay recorded footage through UnifiedMotorSystem')
+    parser.add_argument('--source', action='append', required=True,
+                        help='Video file or image folder, once per camera in CONFIG order')
+    parser.add_argument('--realtime', action='store_true', help='Pace sources at their frame rate [False]')
+    parser.add_argument('--fps', type=float, default=30, help='Frame rate for image folders [30]')
+    parser.add_argument('--load', type=float, default=0.0, help='Simulated load cell reading [0]')
+    parser.add_argument('--display', action='store_true', help='Use CONFIG display mode instead of headless')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if len(args.source) != len(CONFIG['cameras']):
+        raise SystemExit(f"Expected {len(CONFIG['cameras'])} --source arguments, got {len(args.source)}")
+    if not args.display:
+        CONFIG['display']['mode'] = 'headless'
+
+    controller = RecordingController(args.load)
+    store = RecordingDataStore()
+    system = UnifiedMotorSystem(controller=controller, store=store,
+                                replay=ReplaySession(args.source, realtime=args.realtime, fps=args.fps))
+    start = time.time()
+    system.run()
+    print_report(system, controller, store, time.time() - start)
@@ -1,82 +1,233 @@
-import pandas as pd
+"""
+Queries over the DataStore for the dashboard, exports and analysis. Writing lives in
+data_writer; pandas is only imported by the queries that return DataFrames.
+"""
+import numpy as np
 import datetime
+import os
+import queue
 import sqlite3 as db
+import time
+from contextlib import contextmanager
+from threading import Lock
+from data_writer import CLOSE_TIMEOUT, DataWriter, RAW_COLUMNS, ROLLUPS, _Attachments
 
+# grpBy -> (rollup period read, expression over its bucket that gives time_period)
+GROUPINGS = {
+    'Minute': ('Minute', "bucket"),
+    'Hour': ('Hour', "bucket"),
+    'Day': ('Day', "bucket"),
+    'Week': ('Day', "STRFTIME('%Y-W%W', bucket)"),
+    'Month': ('Day', "STRFTIME('%Y-%m', bucket)"),
+    'Year': ('Day', "STRFTIME('%Y', bucket)"),
+}
 
-class DataStore:
-    def __init__(self, make_table=True):
-        self.connection = db.connect("data_file_4.db", check_same_thread=False)
-        self.cur = self.connection.cursor()
-        self.createTables()  # Changed from createTable to createTables
-
-    def createTables(self):
-        """Create both tables if they don't exist"""
-        # Main motor data table
-        self.cur.execute("""CREATE TABLE IF NOT EXISTS storeHouse(
-            time_stamp datetime,
-            speed float,
-            objects float,
-            area float,
-            motor_class varchar(50)
-        );""")
-
-        # New load data table
-        self.cur.execute("""CREATE TABLE IF NOT EXISTS load_data(
-            time_stamp datetime,
-            load_type varchar(50),
-            weight float,
-            status varchar(20) DEFAULT 'normal');
-        """)
-
-        self.connection.commit()
-
-    def insertRow(self, speed, objects, area, motor_class):
-        curDate = datetime.datetime.now()
-        self.cur.execute("INSERT INTO storeHouse VALUES (?, ?, ?, ?, ?)",
-                         (curDate, speed, objects, area, motor_class))
-        self.connection.commit()
-
-    def insertLoadData(self, load_type, weight, status="normal"):
-        """Insert a new load measurement into the database"""
-        print("Load Inserted")
-        curDate = datetime.datetime.now()
-        self.cur.execute(
-            """INSERT INTO load_data 
-               (time_stamp, load_type, weight) 
-               VALUES (?, ?, ?)""",
-            (curDate, load_type, weight))
-        self.connection.commit()
-
-    def add_data(self, speed, objects, area, motor_class):
-        self.insertRow(speed, objects, area, motor_class)
-
-    def add_load_data(self, load_type, weight, status="normal"):
-        self.insertLoadData(load_type, weight, status)
+
+def _open_reader(db_path, directory):
+    """Read-only connection (query_only, partitions attached read-only) wrapped in its _Attachments"""
+    connection = db.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, check_same_thread=False)
+    connection.execute("PRAGMA query_only = ON")
+    return _Attachments(connection, directory, read_only=True)
+
+
+class _ReaderPool:
+    """
+    Up to `size` read-only connections, opened as needed and checked out for one call at a time.
+    WAL lets them read alongside the writer connection; a caller waits when all are busy.
+    """
+
+    def __init__(self, db_path, directory, size):
+        self.db_path = db_path
+        self.directory = directory
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = []
+        self.lock = Lock()
+
+    @contextmanager
+    def reader(self):
+        reader = self._take()
+        try:
+            yield reader
+        finally:
+            self.idle.put(reader)
+
+    def _take(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.opened) < self.size:
+                self.opened.append(_open_reader(self.db_path, self.directory))
+                return self.opened[-1]
+        return self.idle.get()
+
+    def forget(self, path):
+        """Detaches a deleted partition file from the idle readers; busy ones drop it once it is evicted"""
+        idle = []
+        while True:
+            try:
+                idle.append(self.idle.get_nowait())
+            except queue.Empty:
+                break
+        for reader in idle:
+            reader.forget(path)
+            self.idle.put(reader)
+
+    def close(self):
+        for reader in self.opened:
+            reader.connection.close()
+        self.opened = []
+
+
+class DataStore(DataWriter):
+    def __init__(self, make_table=True, db_path="data_file_4.db", buffered=True, batch_rows=200, flush_ms=500,
+                 partition='month', raw_days=None, minute_days=None, archive_dir=None, readers=4):
+        """
+        The writer arguments are DataWriter's. Queries check out one of up to `readers`
+        read-only connections per call, so concurrent dashboard callbacks neither share a cursor
+        nor wait on the writer.
+        """
+        super().__init__(make_table, db_path, buffered, batch_rows, flush_ms, partition, raw_days, minute_days,
+                         archive_dir)
+        self.readers = _ReaderPool(db_path, self.directory, readers)
+
+    def _union(self, table, where, schemas, columns='*', order_by=None, limit=None):
+        body = ' UNION ALL '.join(f"SELECT {columns} FROM {schema}.{table} WHERE {where}" for schema in schemas)
+        sql = f"SELECT * FROM ({body})"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql
+
+    def _query(self, table, where, params, start=None, end=None, order_by=None, descending=False):
+        """DataFrame of table's rows matching where, across main and the partitions overlapping start..end"""
+        import pandas as pd  # only the dashboard and analysis scripts need it
+
+        order = f"{order_by} DESC" if order_by and descending else order_by
+        with self.readers.reader() as reader:
+            frames = [pd.read_sql_query(self._union(table, where, schemas, order_by=order), reader.connection,
+                                        params=list(params) * len(schemas))
+                      for schemas in self._sources(reader, start, end)]
+        if len(frames) == 1:
+            return frames[0]
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(order_by, ascending=not descending, ignore_index=True) if order_by else df
+
+    def _latest(self, table, columns, where, params):
+        """DataFrame of the newest row matching where, reading partitions newest first until one has it"""
+        import pandas as pd
+
+        with self.readers.reader() as reader:
+            for schemas in self._sources(reader, newest_first=True):
+                df = pd.read_sql_query(self._union(table, where, schemas, f"{columns}, time_stamp",
+                                                   order_by="time_stamp DESC", limit=1),
+                                       reader.connection, params=list(params) * len(schemas))
+                if len(df):
+                    break
+        return df[columns.split(', ')]
 
     def get_last_row(self, motor_type):
-        return pd.read_sql_query("SELECT speed FROM storeHouse WHERE motor_class LIKE ? ORDER BY time_stamp DESC LIMIT ?",
-                                 con=self.connection, params=[motor_type, 1])
+        return self._latest('storeHouse', 'speed', 'motor_class = ?', [motor_type])
 
     def get_last_load(self):
         """Get the most recent load measurement"""
-        return pd.read_sql_query("SELECT weight FROM load_data ORDER BY time_stamp DESC LIMIT ?",
-                                 con=self.connection, params=[1])
+        return self._latest('load_data', 'weight', '1', [])
 
     def get_all_data(self, motor_type='seg_belt'):
-        return pd.read_sql_query("SELECT * FROM storeHouse WHERE motor_class LIKE ? ORDER BY time_stamp DESC",
-                                 con=self.connection, params=[motor_type])
+        return self._query('storeHouse', 'motor_class = ?', [motor_type], order_by='time_stamp', descending=True)
+
+    def get_rows_since(self, motor_type, cursor=None, since=None):
+        """
+        storeHouse rows for motor_type added after the row id `cursor`, oldest first, as columns:
+        {'id': int64 array, 'time_stamp': list of str, 'speed'/'objects'/'area': float arrays}.
+        With cursor=None the rows from `since` ('YYYY-MM-DD HH:MM:SS', default today 00:00) are
+        returned instead, to seed a tail. Pass the last id back as the next cursor; the scan
+        starts at the cursor, so each call costs only the rows added since.
+        """
+        today = datetime.date.today().strftime('%Y-%m-%d 00:00:00')
+        columns = 'id, time_stamp, speed, objects, area'
+        if cursor is None:
+            since = since or today
+            where, params = "motor_class = ? AND time_stamp >= ?", [motor_type, since]
+        else:
+            # Cursors come from today's rows, so only partitions from today on can hold newer ids.
+            # The unary + keeps SQLite off the motor_class index so it walks the rowids after the cursor
+            since = today
+            where, params = "id > ? AND +motor_class = ?", [cursor, motor_type]
+        rows = []
+        with self.readers.reader() as reader:
+            for schemas in self._sources(reader, since):
+                rows += reader.connection.execute(self._union('storeHouse', where, schemas, columns),
+                                                  params * len(schemas)).fetchall()
+        rows.sort()
+
+        ids, stamps, speed, objects, area = zip(*rows) if rows else ((), (), (), (), ())
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'time_stamp': list(stamps),
+            'speed': np.array(speed, dtype=float),
+            'objects': np.array(objects, dtype=float),
+            'area': np.array(area, dtype=float),
+        }
+
+    def last_row_id(self):
+        """
+        Newest storeHouse id of the partitions being written (today's on), a cursor for
+        get_rows_since that skips everything stored so far. Ids only increase within the live
+        partitions; a partition imported for older history is numbered on from whichever
+        partition was newest then, so its ids can overlap today's and are left out here.
+        """
+        today = datetime.date.today().isoformat()
+        with self.readers.reader() as reader:
+            return max(reader.connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {schema}.storeHouse").fetchone()[0]
+                       for schemas in self._sources(reader, today) for schema in schemas)
+
+    def iter_rows(self, table, startDate=None, endDate=None, key=None, chunk_rows=5000):
+        """
+        Yields the rows of table (columns as in RAW_COLUMNS) between two dates ('YYYY-MM-DD',
+        inclusive, None = open) as lists of up to chunk_rows tuples, in time order per partition.
+        key keeps one motor_class/load_type. Reads through its own read-only connection rather than
+        the pool, so a slow consumer never holds up other queries, and only one chunk is in memory
+        at a time.
+        """
+        start_date, end_date = self._parse_date(startDate), self._parse_date(endDate)
+        start = start_date.strftime('%Y-%m-%d 00:00:00') if start_date else None
+        end = end_date.strftime('%Y-%m-%d 23:59:59') if end_date else None
+        conditions, params = ["time_stamp IS NOT NULL"], []
+        for condition, value in ((f"{ROLLUPS[table + '_rollup'][1]} = ?", key),
+                                 ("time_stamp >= ?", start), ("time_stamp <= ?", end)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        attachments = _open_reader(self.db_path, self.directory)
+        connection = attachments.connection
+        try:
+            for path in [None] + self._partitions(connection, start, end):
+                schema = attachments.ensure([path])[0] if path else 'main'
+                rows = connection.execute(f"SELECT {', '.join(RAW_COLUMNS[table])} FROM {schema}.{table} "
+                                          f"WHERE {' AND '.join(conditions)} ORDER BY time_stamp", params)
+                while True:
+                    chunk = rows.fetchmany(chunk_rows)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            connection.close()
 
     def get_all_load_data(self, load_type=None):
         """Get all load data, optionally filtered by type"""
         if load_type:
-            return pd.read_sql_query("SELECT * FROM load_data WHERE load_type = ? ORDER BY time_stamp DESC",
-                                     con=self.connection, params=[load_type])
-        return pd.read_sql_query("SELECT * FROM load_data ORDER BY time_stamp DESC",
-                                 con=self.connection)
+            return self._query('load_data', 'load_type = ?', [load_type], order_by='time_stamp', descending=True)
+        return self._query('load_data', '1', [], order_by='time_stamp', descending=True)
 
-    def close(self):
-        self.connection.commit()
-        self.connection.close()
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Commits every queued row, stops the writer thread and closes the database"""
+        if not self.closed:
+            self.readers.close()
+        super().close(timeout)
 
     def get_selected_data(self, startDate, endDate, motor_type='seg_belt'):
         start_date = self._parse_date(startDate) or datetime.date.today()
@@ -85,13 +236,8 @@ class DataStore:
         start_str = start_date.strftime('%Y-%m-%d 00:00:00')
         end_str = end_date.strftime('%Y-%m-%d 23:59:59')
 
-        query = """
-            SELECT * 
-            FROM storeHouse 
-            WHERE motor_class LIKE ? AND time_stamp >= ? AND time_stamp <= ?
-        """
-        return pd.read_sql_query(query, con=self.connection,
-                                 params=[motor_type, start_str, end_str])
+        return self._query('storeHouse', 'motor_class = ? AND time_stamp >= ? AND time_stamp <= ?',
+                           [motor_type, start_str, end_str], start_str, end_str)
 
     def get_selected_load_data(self, startDate, endDate, load_type=None):
         """Get load data within a date range, optionally filtered by type"""
@@ -102,86 +248,90 @@ class DataStore:
         end_str = end_date.strftime('%Y-%m-%d 23:59:59')
 
         if load_type:
-            query = """
-                SELECT * 
-                FROM load_data 
-                WHERE load_type = ? AND time_stamp >= ? AND time_stamp <= ?
-            """
-            return pd.read_sql_query(query, con=self.connection,
-                                     params=[load_type, start_str, end_str])
-        else:
-            query = """
-                SELECT * 
-                FROM load_data 
-                WHERE time_stamp >= ? AND time_stamp <= ?
-            """
-            return pd.read_sql_query(query, con=self.connection,
-                                     params=[start_str, end_str])
+            return self._query('load_data', 'load_type = ? AND time_stamp >= ? AND time_stamp <= ?',
+                               [load_type, start_str, end_str], start_str, end_str)
+        return self._query('load_data', 'time_stamp >= ? AND time_stamp <= ?', [start_str, end_str],
+                           start_str, end_str)
 
     def group_by_data(self, grpBy, motor_type='seg_belt'):
-        group_expr = {
-            'Day': "DATE(time_stamp)",
-            'Month': "STRFTIME('%Y-%m', time_stamp)",
-            'Week': "STRFTIME('%Y-W%W', time_stamp)",
-            'Year': "STRFTIME('%Y', time_stamp)",
-            'Hour': "STRFTIME('%Y-%m-%d %H:00', time_stamp)",
-            'Minute': "STRFTIME('%Y-%m-%d %H:%M', time_stamp)"
-        }.get(grpBy)
-
-        if not group_expr:
+        """
+        Per-period averages (plus min/max and record counts) for one belt, read from the rollup
+        tables. time_stamp is the start of each period and speed/objects/area are its averages,
+        so the result plots the same way as raw rows.
+        """
+        import pandas as pd
+
+        if grpBy not in GROUPINGS:
             raise ValueError("Invalid grouping period")
+        period, group_expr = GROUPINGS[grpBy]
 
         query = f"""
             SELECT
-                *,
+                MIN(bucket) as time_stamp,
+                SUM(speed_sum) / SUM(record_count) as speed,
+                SUM(objects_sum) / SUM(record_count) as objects,
+                SUM(area_sum) / SUM(record_count) as area,
+                motor_class,
                 {group_expr} as time_period,
-                AVG(speed) as avgSpeed,
-                COUNT(*) as record_count
-            FROM storeHouse
-            WHERE motor_class LIKE ?
+                SUM(speed_sum) / SUM(record_count) as avgSpeed,
+                MIN(speed_min) as minSpeed,
+                MAX(speed_max) as maxSpeed,
+                MIN(area_min) as minArea,
+                MAX(area_max) as maxArea,
+                MIN(objects_min) as minObjects,
+                MAX(objects_max) as maxObjects,
+                SUM(record_count) as record_count
+            FROM storeHouse_rollup
+            WHERE period = ? AND motor_class = ?
             GROUP BY time_period
             ORDER BY time_period
         """
-        return pd.read_sql_query(query, self.connection, params=[motor_type])
+        with self.readers.reader() as reader:
+            return pd.read_sql_query(query, reader.connection, params=[period, motor_type])
 
     def group_load_data(self, grpBy, load_type=None):
-        """Group load data by time period"""
-        group_expr = {
-            'Day': "DATE(time_stamp)",
-            'Month': "STRFTIME('%Y-%m', time_stamp)",
-            'Week': "STRFTIME('%Y-W%W', time_stamp)",
-            'Year': "STRFTIME('%Y', time_stamp)",
-            'Hour': "STRFTIME('%Y-%m-%d %H:00', time_stamp)",
-            'Minute': "STRFTIME('%Y-%m-%d %H:%M', time_stamp)"
-        }.get(grpBy)
-
-        if not group_expr:
+        """Group load data by time period, from the rollup tables"""
+        import pandas as pd
+
+        if grpBy not in GROUPINGS:
             raise ValueError("Invalid grouping period")
+        period, group_expr = GROUPINGS[grpBy]
 
         if load_type:
             query = f"""
                 SELECT
                     {group_expr} as time_period,
-                    AVG(weight) as avg_weight,
-                    COUNT(*) as record_count
-                FROM load_data
-                WHERE load_type = ?
+                    SUM(weight_sum) / SUM(record_count) as avg_weight,
+                    MIN(weight_min) as min_weight,
+                    MAX(weight_max) as max_weight,
+                    SUM(record_count) as record_count
+                FROM load_data_rollup
+                WHERE period = ? AND load_type = ?
                 GROUP BY time_period
                 ORDER BY time_period
             """
-            return pd.read_sql_query(query, self.connection, params=[load_type])
+            with self.readers.reader() as reader:
+                return pd.read_sql_query(query, reader.connection, params=[period, load_type])
         else:
             query = f"""
                 SELECT
                     {group_expr} as time_period,
                     load_type,
-                    AVG(weight) as avg_weight,
-                    COUNT(*) as record_count
-                FROM load_data
+                    SUM(weight_sum) / SUM(record_count) as avg_weight,
+                    MIN(weight_min) as min_weight,
+                    MAX(weight_max) as max_weight,
+                    SUM(record_count) as record_count
+                FROM load_data_rollup
+                WHERE period = ?
                 GROUP BY time_period, load_type
                 ORDER BY time_period
             """
-            return pd.read_sql_query(query, self.connection)
+            with self.readers.reader() as reader:
+                return pd.read_sql_query(query, reader.connection, params=[period])
+
+    def _forget_partition(self, path):
+        super()._forget_partition(path)
+        self.readers.forget(path)
 
     def _parse_date(self, date_str):
         """Helper method to parse date strings into date objects."""
@@ -190,4 +340,31 @@ class DataStore:
         try:
             return datetime.datetime.strptime(str(date_str), "%Y-%m-%d").date()
         except ValueError:
-            return None
\ No newline at end of file
+            return None
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DataStore maintenance')
+    parser.add_argument('--db', default="data_file_4.db", help='Database file [data_file_4.db]')
+    parser.add_argument('--partition', default='month', choices=['day', 'month'], help='Partition period [month]')
+    parser.add_argument('--import', dest='imports', action='append', default=[],
+                        help='Copy the rows of an older database file into the partitions (repeatable)')
+    parser.add_argument('--compact', action='store_true', help='Apply retention to raw rows and Minute rollups')
+    parser.add_argument('--raw-days', type=int, default=90, help='Raw rows kept by --compact, in days [90]')
+    parser.add_argument('--minute-days', type=int, default=365, help='Minute rollups kept by --compact [365]')
+    parser.add_argument('--archive-dir', default=None, help='Archive partitions here before --compact deletes them')
+    parser.add_argument('--rebuild-rollups', action='store_true', help='Recompute rollup tables from raw rows')
+    args = parser.parse_args()
+
+    store = DataStore(db_path=args.db, partition=args.partition, archive_dir=args.archive_dir)
+    for path in args.imports:
+        store.import_history(path)
+    if args.compact:
+        removed, deleted = store.compact(args.raw_days, args.minute_days)
+        print(f"🧹 Removed {len(removed)} partitions and {deleted} rows from {args.db}")
+    if args.rebuild_rollups:
+        start = time.time()
+        store.rebuild_rollups()
+        print(f"🗄️ Rebuilt rollups for {args.db} in {time.time() - start:.2f}s")
+    store.close()
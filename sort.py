@@ -19,17 +19,7 @@ from __future__ import print_function
 
 import os
 import numpy as np
-import matplotlib
-
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from skimage import io
-
-import glob
 import time
-import argparse
-from filterpy.kalman import KalmanFilter
 
 np.random.seed(0)
 
@@ -92,6 +82,24 @@ def convert_x_to_bbox(x, score=None):
         return np.array([x[0] - w / 2., x[1] - h / 2., x[0] + w / 2., x[1] + h / 2., score]).reshape((1, 5))
 
 
+def convert_bboxes_to_z(bboxes):
+    """
+    Vectorised convert_bbox_to_z: takes (N,4+) boxes [x1,y1,x2,y2,...] and returns (N,4) [x,y,s,r]
+    """
+    w = bboxes[:, 2] - bboxes[:, 0]
+    h = bboxes[:, 3] - bboxes[:, 1]
+    return np.column_stack([bboxes[:, 0] + w / 2., bboxes[:, 1] + h / 2., w * h, w / h.astype(float)])
+
+
+def convert_xs_to_bboxes(x):
+    """
+    Vectorised convert_x_to_bbox: takes (N,7+) states [x,y,s,r,...] and returns (N,4) [x1,y1,x2,y2]
+    """
+    w = np.sqrt(x[:, 2] * x[:, 3])
+    h = x[:, 2] / w
+    return np.column_stack([x[:, 0] - w / 2., x[:, 1] - h / 2., x[:, 0] + w / 2., x[:, 1] + h / 2.])
+
+
 class KalmanBoxTracker(object):
     """
     This class represents the internal state of individual tracked objects observed as bbox.
@@ -102,6 +110,9 @@ class KalmanBoxTracker(object):
         """
         Initialises a tracker using initial bounding box.
         """
+        # filterpy.kalman pulls in scipy.stats; Sort itself runs on KalmanTrackStore and never needs it
+        from filterpy.kalman import KalmanFilter
+
         # define constant velocity model
         self.kf = KalmanFilter(dim_x=7, dim_z=4)
         self.kf.F = np.array(
@@ -156,49 +167,306 @@ class KalmanBoxTracker(object):
         return convert_x_to_bbox(self.kf.x)
 
 
+class KalmanTrackStore(object):
+    """
+    Holds every live track's state and covariance in stacked arrays so that predict and update
+    run as single batched operations, instead of one filterpy KalmanFilter per object.
+    Uses the same constant velocity model and noise settings as KalmanBoxTracker, and takes
+    track ids from KalmanBoxTracker.count.
+    """
+    F = np.array(
+        [[1, 0, 0, 0, 1, 0, 0], [0, 1, 0, 0, 0, 1, 0], [0, 0, 1, 0, 0, 0, 1], [0, 0, 0, 1, 0, 0, 0],
+         [0, 0, 0, 0, 1, 0, 0], [0, 0, 0, 0, 0, 1, 0], [0, 0, 0, 0, 0, 0, 1]], dtype=float)
+    R = np.diag([1., 1., 10., 10.])
+    Q = np.diag([1., 1., 1., 1., 0.01, 0.01, 0.0001])
+    P0 = np.diag([10., 10., 10., 10., 10000., 10000., 10000.])
+
+    def __init__(self):
+        self.velocity_prior = None  # expected (du, dv) per frame, e.g. from the belt speed
+        self.velocity_var = 4.0
+        self.x = np.zeros((0, 7))
+        self.P = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=int)
+        self.time_since_update = np.zeros(0, dtype=int)
+        self.hits = np.zeros(0, dtype=int)
+        self.hit_streak = np.zeros(0, dtype=int)
+        self.age = np.zeros(0, dtype=int)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, bboxes):
+        """
+        Starts a track for each of the (M,4+) boxes, in order.
+        """
+        m = len(bboxes)
+        x = np.zeros((m, 7))
+        x[:, :4] = convert_bboxes_to_z(bboxes)
+        P0 = self.P0
+        if self.velocity_prior is not None:
+            # New tracks start moving with the belt instead of from rest with huge uncertainty
+            x[:, 4:6] = self.velocity_prior
+            P0 = P0.copy()
+            P0[4, 4] = P0[5, 5] = self.velocity_var
+        ids = np.arange(KalmanBoxTracker.count, KalmanBoxTracker.count + m)
+        KalmanBoxTracker.count += m
+
+        zeros = np.zeros(m, dtype=int)
+        self.x = np.concatenate([self.x, x])
+        self.P = np.concatenate([self.P, np.broadcast_to(P0, (m, 7, 7))])
+        self.ids = np.concatenate([self.ids, ids])
+        self.time_since_update = np.concatenate([self.time_since_update, zeros])
+        self.hits = np.concatenate([self.hits, zeros])
+        self.hit_streak = np.concatenate([self.hit_streak, zeros])
+        self.age = np.concatenate([self.age, zeros])
+
+    def set_velocity_prior(self, velocity, var=4.0):
+        """
+        Expected centre velocity (du, dv) in pixels per frame, or None to turn the prior off.
+        Seeds new tracks and is applied to every track as a velocity measurement with variance var.
+        """
+        self.velocity_prior = None if velocity is None else np.asarray(velocity, dtype=float)
+        self.velocity_var = var
+
+    def _apply_velocity_prior(self):
+        if self.velocity_prior is None or len(self.ids) == 0:
+            return
+        P = self.P
+        R = self.velocity_var * np.eye(2)
+        K = P[:, :, 4:6] @ np.linalg.inv(P[:, 4:6, 4:6] + R)
+        y = self.velocity_prior - self.x[:, 4:6]
+        self.x = self.x + (K @ y[:, :, None])[:, :, 0]
+        I_KH = np.broadcast_to(np.eye(7), P.shape).copy()
+        I_KH[:, :, 4:6] -= K
+        self.P = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ R @ K.transpose(0, 2, 1)
+
+    def _advance(self):
+        self._apply_velocity_prior()
+        shrinking = (self.x[:, 6] + self.x[:, 2]) <= 0
+        self.x[shrinking, 6] *= 0.0
+        self.x = self.x @ self.F.T
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.age += 1
+
+    def predict(self):
+        """
+        Advances all tracks one frame and returns the predicted (N,4) boxes.
+        """
+        self._advance()
+        self.hit_streak[self.time_since_update > 0] = 0
+        self.time_since_update += 1
+        return self.get_state()
+
+    def coast(self):
+        """
+        Advances all tracks like predict() without counting a missed detection.
+        """
+        self._advance()
+        return self.get_state()
+
+    def update(self, idx, bboxes):
+        """
+        Corrects tracks idx with their matched (M,4+) boxes.
+        """
+        if len(idx) == 0:
+            return
+        x, P = self.x[idx], self.P[idx]
+        y = convert_bboxes_to_z(bboxes) - x[:, :4]
+        PHT = P[:, :, :4]
+        S = P[:, :4, :4] + self.R
+        K = PHT @ np.linalg.inv(S)
+        x = x + (K @ y[:, :, None])[:, :, 0]
+        I_KH = np.broadcast_to(np.eye(7), P.shape).copy()
+        I_KH[:, :, :4] -= K
+        P = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self.R @ K.transpose(0, 2, 1)
+
+        self.x[idx], self.P[idx] = x, P
+        self.time_since_update[idx] = 0
+        self.hits[idx] += 1
+        self.hit_streak[idx] += 1
+
+    def get_state(self):
+        """
+        Returns the current (N,4) bounding box estimates.
+        """
+        return convert_xs_to_bboxes(self.x)
+
+    STATE_FIELDS = ('x', 'P', 'ids', 'time_since_update', 'hits', 'hit_streak', 'age')
+
+    def state(self):
+        """
+        The stacked track arrays by name, e.g. for np.savez.
+        """
+        return {name: getattr(self, name) for name in self.STATE_FIELDS}
+
+    def load_state(self, state):
+        for name in self.STATE_FIELDS:
+            setattr(self, name, np.array(state[name], dtype=getattr(self, name).dtype))
+
+    def keep(self, mask):
+        """
+        Drops the tracks where mask is False, preserving order.
+        """
+        self.x, self.P, self.ids = self.x[mask], self.P[mask], self.ids[mask]
+        self.time_since_update = self.time_since_update[mask]
+        self.hits, self.hit_streak, self.age = self.hits[mask], self.hit_streak[mask], self.age[mask]
+
+
+def iou_pairs(bb_test, bb_gt, det_idx, trk_idx):
+    """
+    IOU of the given (detection, tracker) index pairs only, same arithmetic as iou_batch
+    """
+    a = bb_test[det_idx]
+    b = bb_gt[trk_idx]
+    w = np.maximum(0., np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]))
+    h = np.maximum(0., np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]))
+    wh = w * h
+    return wh / ((a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]) + (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]) - wh)
+
+
+def _grid_cells(boxes, cell):
+    """
+    Grid cells covered by each box, as flat (box_idx, cell_key) arrays.
+    Returns None if the boxes span too many cells for the grid to pay off.
+    """
+    c0 = np.floor(boxes[:, :2] / cell).astype(np.int64)
+    c1 = np.floor(boxes[:, 2:4] / cell).astype(np.int64)
+    nx = np.maximum(c1[:, 0] - c0[:, 0] + 1, 1)
+    ny = np.maximum(c1[:, 1] - c0[:, 1] + 1, 1)
+    counts = nx * ny
+    if counts.sum() > 16 * len(boxes):
+        return None
+    idx = np.repeat(np.arange(len(boxes)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    gx = c0[idx, 0] + local % nx[idx]
+    gy = c0[idx, 1] + local // nx[idx]
+    return idx, (gx << 32) + gy
+
+
+def candidate_pairs(detections, trackers, dense_limit=1024):
+    """
+    Returns (det_idx, trk_idx, iou) for every detection/tracker pair with IOU > 0.
+
+    Small problems use iou_batch directly. Larger ones bucket the boxes on a uniform grid sized
+    to the typical box, so only boxes sharing a cell are compared.
+    """
+    det_boxes = detections[:, :4]
+    trk_boxes = trackers[:, :4]
+    grid = None
+    if len(det_boxes) * len(trk_boxes) > dense_limit and np.isfinite(det_boxes).all():
+        sizes = np.concatenate([det_boxes[:, 2:4] - det_boxes[:, :2], trk_boxes[:, 2:4] - trk_boxes[:, :2]])
+        cell = max(float(np.median(sizes)), 1.0)
+        det_cells = _grid_cells(det_boxes, cell)
+        trk_cells = _grid_cells(trk_boxes, cell)
+        if det_cells is not None and trk_cells is not None:
+            grid = det_cells, trk_cells
+
+    if grid is None:
+        iou_matrix = iou_batch(det_boxes, trk_boxes)
+        det_idx, trk_idx = np.nonzero(iou_matrix > 0)
+        return det_idx, trk_idx, iou_matrix[det_idx, trk_idx]
+
+    (d_idx, d_key), (t_idx, t_key) = grid
+    order = np.argsort(t_key, kind='stable')
+    t_key = t_key[order]
+    t_idx = t_idx[order]
+    lo = np.searchsorted(t_key, d_key, side='left')
+    n = np.searchsorted(t_key, d_key, side='right') - lo
+    offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    det_idx = np.repeat(d_idx, n)
+    trk_idx = t_idx[np.repeat(lo, n) + offsets]
+    # Boxes sharing several cells show up once per cell
+    pair = np.unique(det_idx * len(trk_boxes) + trk_idx)
+    det_idx, trk_idx = np.divmod(pair, len(trk_boxes))
+    iou = iou_pairs(det_boxes, trk_boxes, det_idx, trk_idx)
+    keep = iou > 0
+    return det_idx[keep], trk_idx[keep], iou[keep]
+
+
 def associate_detections_to_trackers(detections, trackers, iou_threshold=0.3):
     """
     Assigns detections to tracked object (both represented as bounding boxes)
 
+    Only overlapping pairs are considered. Pairs with zero IOU add nothing to the assignment, so
+    solving each connected group of overlapping boxes on its own gives the same matches as solving
+    the full IOU matrix.
+
     Returns 3 lists of matches, unmatched_detections and unmatched_trackers
     """
     if (len(trackers) == 0):
         return np.empty((0, 2), dtype=int), np.arange(len(detections)), np.empty((0, 5), dtype=int)
 
-    iou_matrix = iou_batch(detections, trackers)
+    n_det, n_trk = len(detections), len(trackers)
+    det_idx, trk_idx, iou = candidate_pairs(detections, trackers)
 
-    if min(iou_matrix.shape) > 0:
-        a = (iou_matrix > iou_threshold).astype(np.int32)
-        if a.sum(1).max() == 1 and a.sum(0).max() == 1:
-            matched_indices = np.stack(np.where(a), axis=1)
-        else:
-            matched_indices = linear_assignment(-iou_matrix)
-    else:
-        matched_indices = np.empty(shape=(0, 2))
-
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if (d not in matched_indices[:, 0]):
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if (t not in matched_indices[:, 1]):
-            unmatched_trackers.append(t)
-
-    # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if (iou_matrix[m[0], m[1]] < iou_threshold):
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if (len(matches) == 0):
-        matches = np.empty((0, 2), dtype=int)
+    above = iou > iou_threshold
+    if above.any() and np.bincount(det_idx[above]).max() == 1 and np.bincount(trk_idx[above]).max() == 1:
+        matches = np.column_stack([det_idx[above], trk_idx[above]])
     else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+        matches = _assign_components(n_det, n_trk, det_idx, trk_idx, iou)
+        # filter out matched with low IOU
+        matches = matches[iou_pairs(detections, trackers, matches[:, 0], matches[:, 1]) >= iou_threshold]
+        if n_det > n_trk and len(matches) < n_trk:
+            # The full assignment also pairs the leftover trackers with some leftover detections,
+            # which then come last in unmatched_detections and so get the last new track ids.
+            # Which ones is down to the solver's ties over zero IOU, so solve the full matrix.
+            return _associate_dense(detections, trackers, iou_threshold)
+
+    matches = matches[np.argsort(matches[:, 0], kind='stable')]
+    det_matched = np.zeros(n_det, dtype=bool)
+    det_matched[matches[:, 0]] = True
+    trk_matched = np.zeros(n_trk, dtype=bool)
+    trk_matched[matches[:, 1]] = True
+    return matches, np.flatnonzero(~det_matched), np.flatnonzero(~trk_matched)
+
+
+def _associate_dense(detections, trackers, iou_threshold):
+    """
+    associate_detections_to_trackers on the full IOU matrix: unmatched detections are the
+    unassigned ones, then the assigned ones below iou_threshold, as the original loops returned them
+    """
+    iou_matrix = iou_batch(detections, trackers)
+    matched = linear_assignment(-iou_matrix).reshape(-1, 2).astype(int)
+    low = iou_matrix[matched[:, 0], matched[:, 1]] < iou_threshold
+    det_assigned = np.zeros(len(detections), dtype=bool)
+    det_assigned[matched[:, 0]] = True
+    trk_assigned = np.zeros(len(trackers), dtype=bool)
+    trk_assigned[matched[:, 1]] = True
+    return (matched[~low],
+            np.concatenate([np.flatnonzero(~det_assigned), matched[low, 0]]),
+            np.concatenate([np.flatnonzero(~trk_assigned), matched[low, 1]]))
+
+
+def _assign_components(n_det, n_trk, det_idx, trk_idx, iou):
+    """
+    Runs linear_assignment separately on each connected component of the sparse
+    detection/tracker overlap graph. Returns an (N, 2) array of [det, trk] pairs.
+    """
+    if len(det_idx) == 0:
+        return np.empty((0, 2), dtype=int)
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    graph = coo_matrix((np.ones(len(det_idx)), (det_idx, n_det + trk_idx)), shape=(n_det + n_trk,) * 2)
+    _, labels = connected_components(graph, directed=False)
+    comp = labels[det_idx]
+    pairs_per_comp = np.bincount(comp)
+
+    # A component made of a single pair is its own assignment
+    single = pairs_per_comp[comp] == 1
+    matches = [np.column_stack([det_idx[single], trk_idx[single]])]
+
+    rest = np.flatnonzero(~single)
+    rest = rest[np.argsort(comp[rest], kind='stable')]
+    bounds = np.flatnonzero(np.diff(comp[rest])) + 1
+    for group in np.split(rest, bounds) if len(rest) else []:
+        dets, d_local = np.unique(det_idx[group], return_inverse=True)
+        trks, t_local = np.unique(trk_idx[group], return_inverse=True)
+        cost = np.zeros((len(dets), len(trks)))
+        cost[d_local, t_local] = -iou[group]
+        assigned = linear_assignment(cost).reshape(-1, 2).astype(int)
+        matches.append(np.column_stack([dets[assigned[:, 0]], trks[assigned[:, 1]]]))
+    return np.concatenate(matches).astype(int)
 
 
 class Sort(object):
@@ -209,7 +477,7 @@ class Sort(object):
         self.max_age = max_age
         self.min_hits = min_hits
         self.iou_threshold = iou_threshold
-        self.trackers = []
+        self.tracks = KalmanTrackStore()
         self.frame_count = 0
 
     def update(self, dets=np.empty((0, 5))):
@@ -223,43 +491,80 @@ class Sort(object):
         """
         self.frame_count += 1
         # get predicted locations from existing trackers.
-        trks = np.zeros((len(self.trackers), 5))
-        to_del = []
-        ret = []
-        for t, trk in enumerate(trks):
-            pos = self.trackers[t].predict()[0]
-            trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
-            if np.any(np.isnan(pos)):
-                to_del.append(t)
-        trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
-        for t in reversed(to_del):
-            self.trackers.pop(t)
+        trks = self.tracks.predict()
+        valid = ~np.any(np.isnan(trks), axis=1)
+        if not valid.all():
+            self.tracks.keep(valid)
+            trks = trks[valid]
         matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets, trks, self.iou_threshold)
 
         # update matched trackers with assigned detections
-        for m in matched:
-            self.trackers[m[1]].update(dets[m[0], :])
+        if len(matched) > 0:
+            self.tracks.update(matched[:, 1].astype(int), dets[matched[:, 0].astype(int), :4])
 
         # create and initialise new trackers for unmatched detections
-        for i in unmatched_dets:
-            trk = KalmanBoxTracker(dets[i, :])
-            self.trackers.append(trk)
-        i = len(self.trackers)
-        for trk in reversed(self.trackers):
-            d = trk.get_state()[0]
-            if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
-                ret.append(np.concatenate((d, [trk.id + 1])).reshape(1, -1))  # +1 as MOT benchmark requires positive
-            i -= 1
-            # remove dead tracklet
-            if (trk.time_since_update > self.max_age):
-                self.trackers.pop(i)
-        if (len(ret) > 0):
-            return np.concatenate(ret)
-        return np.empty((0, 5))
+        if len(unmatched_dets) > 0:
+            self.tracks.add(dets[unmatched_dets.astype(int), :4])
+
+        ret = self._confirmed(self.tracks.get_state())
+        # remove dead tracklets
+        self.tracks.keep(self.tracks.time_since_update <= self.max_age)
+        return ret
+
+    def _confirmed(self, states, valid=None):
+        """
+        Returns [x1,y1,x2,y2,id+1] rows for tracks updated this frame that have enough hits,
+        newest track first.
+        """
+        t = self.tracks
+        live = (t.time_since_update < 1) & ((t.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits))
+        if valid is not None:
+            live &= valid
+        out = np.flatnonzero(live)[::-1]
+        if len(out) == 0:
+            return np.empty((0, 5))
+        return np.column_stack([states[out], t.ids[out] + 1])  # +1 as MOT benchmark requires positive
+
+    def set_belt_velocity(self, velocity, var=4.0):
+        """
+        Constrains track motion to the belt: velocity is the expected (dx, dy) box shift in pixels
+        until the next update()/coast() call, or None to go back to the plain constant velocity model.
+        """
+        self.tracks.set_velocity_prior(velocity, var)
+
+    def snapshot(self):
+        """
+        Tracker state as a dict of arrays (see track_snapshot), including the next track id.
+        """
+        state = dict(self.tracks.state())
+        state['frame_count'] = np.array(self.frame_count)
+        state['next_id'] = np.array(KalmanBoxTracker.count)
+        return state
+
+    def restore(self, state):
+        """
+        Continues from a snapshot(): tracks keep their ids and hit streaks, so confirmed objects
+        are reported again straight away, and new ids carry on after the saved ones.
+        """
+        self.tracks.load_state(state)
+        self.frame_count = int(state['frame_count'])
+        KalmanBoxTracker.count = max(KalmanBoxTracker.count, int(state['next_id']))
+
+    def coast(self):
+        """
+        Advances every track on its motion model for a frame where detection was skipped
+        (e.g. an unchanged belt), without ageing tracks towards max_age.
+        Returns the confirmed tracks in the same format as update().
+        """
+        self.frame_count += 1
+        states = self.tracks.coast()
+        return self._confirmed(states, ~np.any(np.isnan(states), axis=1))
 
 
 def parse_args():
     """Parse input arguments."""
+    import argparse
+
     parser = argparse.ArgumentParser(description='SORT demo')
     parser.add_argument('--display', dest='display', help='Display online tracker output (slow) [False]',
                         action='store_true')
@@ -277,6 +582,8 @@ def parse_args():
 
 
 if __name__ == '__main__':
+    import glob
+
     # all train
     args = parse_args()
     display = args.display
@@ -289,6 +596,13 @@ if __name__ == '__main__':
             print(
                 '\n\tERROR: mot_benchmark link not found!\n\n    Create a symbolic link to the MOT benchmark\n    (https://motchallenge.net/data/2D_MOT_2015/#download). E.g.:\n\n    $ ln -s /path/to/MOT2015_challenge/2DMOT2015 mot_benchmark\n\n')
             exit()
+        import matplotlib
+
+        matplotlib.use('TkAgg')
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as patches
+        from skimage import io
+
         plt.ion()
         fig = plt.figure()
         ax1 = fig.add_subplot(111, aspect='equal')
@@ -15,6 +15,7 @@ class DualMotorSpeedController:
             'MIN_CHANGE_DELAY': 3,
             'SMOOTHING_WINDOW': 1,
             'MAX_COUNT': 5,
+            'MAX_RATE': 30,  # objects/min crossing the counting line
             'MAX_AREA': 100,
             'COUNT_WEIGHT': 0.5,
             'AREA_WEIGHT': 0.8
@@ -38,8 +39,11 @@ class DualMotorSpeedController:
     def _normalize(self, value, max_value):
         return 1.0 - min(value / max_value, 1.0)
 
-    def _calculate_motor1_speed(self, object_count, total_area):
-        norm_count = self._normalize(object_count, self.motor1['MAX_COUNT'])
+    def _calculate_motor1_speed(self, object_count, total_area, object_rate=None):
+        if object_rate is None:
+            norm_count = self._normalize(object_count, self.motor1['MAX_COUNT'])
+        else:
+            norm_count = self._normalize(object_rate, self.motor1['MAX_RATE'])
         norm_area = self._normalize(total_area, self.motor1['MAX_AREA'])
         speed_factor = (self.motor1['COUNT_WEIGHT'] * norm_count) + \
                        (self.motor1['AREA_WEIGHT'] * norm_area)
@@ -67,8 +71,8 @@ class DualMotorSpeedController:
         return (time_since_change >= motor['MIN_CHANGE_DELAY'] and
                 (speed_delta >= min_delta or not motor['speed_history']))
 
-    def update_motor1_speed(self, object_count, total_area):
-        target_speed = self._calculate_motor1_speed(object_count, total_area)
+    def update_motor1_speed(self, object_count, total_area, object_rate=None):
+        target_speed = self._calculate_motor1_speed(object_count, total_area, object_rate)
         smoothed_speed = self._apply_smoothing(self.motor1, target_speed)
 
         if self._should_update_speed(self.motor1, smoothed_speed):
@@ -0,0 +1,101 @@
+"""
+SORT must hand out the same track ids as the original dense association, whose unmatched
+detections order decides which new track gets which id.
+"""
+import numpy as np
+import pytest
+import sort
+from benchmarks.conveyor_tracks import generate_scene
+from sort import Sort, iou_batch, linear_assignment
+
+
+def naive_associate(detections, trackers, iou_threshold=0.3):
+    """associate_detections_to_trackers as it was before the sparse association"""
+    if (len(trackers) == 0):
+        return np.empty((0, 2), dtype=int), np.arange(len(detections)), np.empty((0, 5), dtype=int)
+
+    iou_matrix = iou_batch(detections, trackers)
+
+    if min(iou_matrix.shape) > 0:
+        a = (iou_matrix > iou_threshold).astype(np.int32)
+        if a.sum(1).max() == 1 and a.sum(0).max() == 1:
+            matched_indices = np.stack(np.where(a), axis=1)
+        else:
+            matched_indices = linear_assignment(-iou_matrix)
+    else:
+        matched_indices = np.empty(shape=(0, 2))
+
+    unmatched_detections = []
+    for d, det in enumerate(detections):
+        if (d not in matched_indices[:, 0]):
+            unmatched_detections.append(d)
+    unmatched_trackers = []
+    for t, trk in enumerate(trackers):
+        if (t not in matched_indices[:, 1]):
+            unmatched_trackers.append(t)
+
+    matches = []
+    for m in matched_indices:
+        if (iou_matrix[m[0], m[1]] < iou_threshold):
+            unmatched_detections.append(m[0])
+            unmatched_trackers.append(m[1])
+        else:
+            matches.append(m.reshape(1, 2))
+    if (len(matches) == 0):
+        matches = np.empty((0, 2), dtype=int)
+    else:
+        matches = np.concatenate(matches, axis=0)
+
+    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+
+
+def random_boxes(rng, count):
+    xy = rng.uniform(0, 300, (count, 2))
+    return np.column_stack([xy, xy + rng.uniform(20, 80, (count, 2)), np.ones(count)])
+
+
+def random_scene(frames=150, seed=0):
+    """Objects that appear, drift and disappear at random, so detections often outnumber tracks"""
+    rng = np.random.default_rng(seed)
+    boxes = random_boxes(rng, 10)
+    for _ in range(frames):
+        boxes = boxes[rng.random(len(boxes)) > 0.1]
+        boxes[:, :4] += rng.normal(0, 4, (len(boxes), 1)) + [0, 6, 0, 6]
+        boxes = np.vstack([boxes, random_boxes(rng, rng.poisson(2))])
+        yield boxes
+
+
+def conveyor_scene(seed=0):
+    dets, _ = generate_scene(30, 8, 0.2, 3, frames=150, seed=seed)
+    for frame in range(1, 151):
+        rows = dets[dets[:, 0] == frame]
+        yield np.column_stack([rows[:, 2:4], rows[:, 2:4] + rows[:, 4:6], rows[:, 6]])
+
+
+def track(scene):
+    sort.KalmanBoxTracker.count = 0
+    tracker = Sort(max_age=5, min_hits=3, iou_threshold=0.3)
+    return [tracker.update(dets) for dets in scene]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_association_matches_naive(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(500):
+        dets = random_boxes(rng, rng.integers(1, 20))
+        trks = random_boxes(rng, rng.integers(1, 20))
+        matches, unmatched_dets, _ = sort.associate_detections_to_trackers(dets, trks)
+        expected_matches, expected_dets, _ = naive_associate(dets, trks)
+        np.testing.assert_array_equal(matches, expected_matches)
+        np.testing.assert_array_equal(unmatched_dets, expected_dets)
+
+
+@pytest.mark.parametrize('scene', [random_scene, conveyor_scene])
+@pytest.mark.parametrize('seed', range(3))
+def test_track_ids_match_naive(scene, seed, monkeypatch):
+    tracked = track(scene(seed=seed))
+    monkeypatch.setattr(sort, 'associate_detections_to_trackers', naive_associate)
+    expected = track(scene(seed=seed))
+    assert len(tracked) == len(expected)
+    for frame, (rows, expected_rows) in enumerate(zip(tracked, expected)):
+        np.testing.assert_array_equal(rows, expected_rows, err_msg=f"frame {frame}")
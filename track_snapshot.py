@@ -0,0 +1,58 @@
+"""
+Compact binary snapshots of tracker and line counter state, so a restarted UnifiedMotorSystem
+carries on with the same track ids and counts instead of recounting objects already on the belt.
+
+A snapshot is one .npz file of plain arrays (no pickles), written to a temporary file and renamed
+so a crash mid-write never leaves a truncated snapshot behind.
+"""
+import os
+import time
+import numpy as np
+
+
+def camera_snapshot_path(path, frame_idx):
+    """Per-camera file next to path, used by vision workers that each own their tracker"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.cam{frame_idx}{ext}"
+
+
+def save_snapshot(path, parts):
+    """
+    parts: {name: {key: array}} as returned by Sort.snapshot() / LineCrossingCounter.snapshot().
+    None entries are skipped.
+    """
+    arrays = {'saved_at': np.array(time.time())}
+    for name, state in parts.items():
+        if state is None:
+            continue
+        for key, value in state.items():
+            arrays[f"{name}/{key}"] = value
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, max_age):
+    """
+    Returns {name: {key: array}} from the snapshot at path, or None if there is none, it is older
+    than max_age seconds or it can't be read.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            age = time.time() - float(data['saved_at'])
+            if age > max_age:
+                print(f"⏳ Ignoring track snapshot {path}, saved {age:.0f}s ago")
+                return None
+            parts = {}
+            for key in data.files:
+                if key == 'saved_at':
+                    continue
+                name, field = key.split('/', 1)
+                parts.setdefault(name, {})[field] = data[key]
+            return parts
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Could not read track snapshot {path}: {e}")
+        return None
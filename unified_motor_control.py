@@ -1,4 +1,3 @@
-from ultralytics import YOLO
 import cv2
 import math
 import time
@@ -6,8 +5,15 @@ from sort import *
 import cvzone
 import numpy as np
 from motor_controller import ConveyorSystemController
+from frame_grabber import CameraCaptureThread, FrameSignal, open_camera
+from detectors import create_detector, empty_detections, filter_detections, predict_rois
+from motion_gate import BeltMotionPrior, MotionGate
+from line_counter import LineCrossingCounter
+from track_snapshot import load_snapshot, save_snapshot
+from vision_workers import VisionWorkerPool
+from renderer import MjpegRenderer
 from speedController import DualMotorSpeedController
-import shared_data
+import data_writer
 from threading import Lock
 
 # Global configuration
@@ -25,6 +31,12 @@ CONFIG = {
                 'coords': [200, 0, 850, 720],
                 'line_coords': [450, 152, 600, 152]
             },
+            'belt_motion': {
+                'motor': 'motor1',
+                # Placeholder, calibrate per belt and camera mount: (dx, dy) image shift in pixels per
+                # motor step, e.g. a marker's travel across the frame divided by the steps it took
+                'pixels_per_step': [0.0, 0.05]
+            },
             "area_scale_factor": 1.5
         },
         {
@@ -48,8 +60,51 @@ CONFIG = {
 
 
     'model': {
+        'backend': 'ultralytics',  # or 'onnxruntime' (export with detectors.export_onnx first)
         'path': "runs/detect/train3/weights/best.pt",
-        'conf_threshold': 0.035
+        'onnx_path': "runs/detect/train3/weights/best.onnx",
+        'onnx_providers': ['CPUExecutionProvider'],
+        'imgsz': 640,
+        'conf_threshold': 0.035,
+        'max_detections': 100,  # highest-confidence boxes kept per frame after the conveyor filter
+        'crop_to_conveyor': False  # run the model on the conveyor.coords crop only
+    },
+    'motion_gate': {
+        'enabled': True,
+        'downscale': 0.125,  # ROI thumbnail scale used for frame differencing
+        'pixel_threshold': 25,  # grey-level change for a thumbnail pixel to count as moved
+        'change_ratio': 0.01,  # fraction of moved pixels that triggers inference
+        'max_skip': 15  # run inference at least every max_skip + 1 frames
+    },
+    'tracking': {
+        'belt_prior': False,  # constrain track velocity to the belt speed (cameras with belt_motion)
+        'velocity_var': 4.0,  # how far (px/frame, as variance) tracks may stray from the belt velocity
+        'detect_every': 1  # with belt_prior, run inference on every Nth frame and coast tracks between
+    },
+    'counting': {
+        'rate_window': 60,  # seconds of line crossings behind the objects/min rate
+        'max_idle_frames': 40,  # forget a track's line state after this many frames unseen (> SORT max_age)
+        'rate_control': False  # drive motor 1 from the objects/min rate (MAX_RATE) instead of the count
+    },
+    'snapshot': {
+        'enabled': True,  # save tracker/counter state and resume from it after a restart
+        'path': 'track_snapshot.npz',  # vision workers add .cam<i> for their own trackers
+        'interval': 5.0,  # seconds between periodic snapshots
+        'max_age': 30.0  # ignore snapshots older than this at startup
+    },
+    'storage': {
+        'db_path': "data_file_4.db",  # catalog and rollups; raw rows go to data_file_4.<period>.db next to it
+        'partition': 'month',  # 'day' or 'month' partition files, None for a single file
+        'raw_days': 90,  # partitions older than this are deleted when a new one starts (rollups keep them)
+        'minute_days': 365,  # Minute rollups kept; Hour and Day rollups are kept for good
+        'archive_dir': 'history_archive'  # closed partitions as NumPy column files (history_archive.py)
+    },
+    'capture': {
+        'read_timeout': 1.0  # seconds to wait for a fresh frame before reporting the camera
+    },
+    'vision_workers': {
+        'enabled': False,  # one process per camera for capture, inference and tracking
+        'ring_slots': 4  # shared-memory frames per camera handed to the coordinator
     },
     'motor': {
         'port': "COM5",
@@ -57,6 +112,12 @@ CONFIG = {
         'speed_factor': 1
     },
     'classes': ['typeOne', 'typeTwo', 'typeThree', 'typeFour'],
+    'display': {
+        'mode': 'window',  # 'window' (cv2.imshow), 'mjpeg' (HTTP stream) or 'headless' (no overlays)
+        'max_fps': 5,  # overlay rate of the mjpeg renderer
+        'host': '127.0.0.1',
+        'port': 8090
+    },
     'visualization': {
         'conveyor_color': (255, 0, 0),
         'conveyor_thickness': 3,
@@ -67,19 +128,36 @@ CONFIG = {
 }
 
 # Global instances
-data_store = shared_data.DataStore()
 frame_lock = Lock()
 
 
 class UnifiedMotorSystem:
-    def __init__(self):
-        self.controller = ConveyorSystemController('COM5', 9600)
+    def __init__(self, controller=None, store=None, replay=None):
+        # controller/store/replay are swapped for recording stand-ins by replay.py
+        self.controller = controller or ConveyorSystemController(CONFIG['motor']['port'], CONFIG['motor']['baudrate'])
+        # Opened here rather than at import, so benchmarks and replay never touch the production database
+        self.data_store = store or data_writer.DataWriter(**CONFIG['storage'])
+        self.replay = replay
         self.speed_controller = DualMotorSpeedController()
         self.caps = []
-        self.models = []
+        self.grabbers = []
+        self.frame_signal = FrameSignal()  # notified by every grabber, so run() waits on all cameras at once
+        self.frame_times = []  # when each camera last delivered a frame
+        self.stale = []  # cameras currently reported as stalled
+        self.frames_skipped = []
+        self.model = None
         self.trackers = []
-        self.tracked_objects = []
+        self.motion_gates = []
+        self.motion_skipped = []
+        self.belt_priors = []  # BeltMotionPrior per camera, None without belt_prior/belt_motion
+        self.last_detections = []
+        self.counters = []  # LineCrossingCounter for cameras with conveyor.line_coords
+        self.tracked_objects = []  # track ids seen on the conveyor, for cameras without a line
         self.camera_windows = []
+        self.workers = None
+        self.renderer = None
+        self.views = []  # latest per-camera frame and results, drawn by render_view()
+        self.last_snapshot_time = None  # set once state is initialised (and restored), see save_state()
 
         # Motor 2 specific states
         self.belt_active = False
@@ -95,28 +173,22 @@ class UnifiedMotorSystem:
 
     def initialize_cameras(self):
         print("🚀 Initializing cameras...")
+        # One set of weights shared by every camera; frames are batched in detect_batch()
+        self.model = create_detector(CONFIG['model'])
         for i, cam_cfg in enumerate(CONFIG['cameras']):
             cap = None
             try:
-                port = cam_cfg['port']
-                if port == 1:
-                    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+                if self.replay:
+                    cap, grabber = self.replay.open(i, cam_cfg, self.frame_signal)
                 else:
-                    cap = cv2.VideoCapture(port, cv2.CAP_DSHOW)
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, cam_cfg['width'])
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, cam_cfg['height'])
-                cap.set(cv2.CAP_PROP_FPS, 30)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 2)
-                cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-
+                    cap = open_camera(cam_cfg)
+                    grabber = CameraCaptureThread(cap, cam_cfg['name'], flip=cam_cfg['flip'], signal=self.frame_signal)
                 if not cap.isOpened():
                     raise RuntimeError(f"Camera {i} failed to open")
 
                 self.caps.append(cap)
-                self.models.append(YOLO(CONFIG['model']['path']))
-                self.trackers.append(Sort(max_age=20, min_hits=3, iou_threshold=0.3))
-                self.tracked_objects.append([])
-                self.camera_windows.append(cam_cfg['name'])
+                self.grabbers.append(grabber)
+                self.init_camera_state(cam_cfg)
 
                 print(f"✅ Camera {i} ({cam_cfg['name']}) initialized successfully")
 
@@ -126,23 +198,102 @@ class UnifiedMotorSystem:
                     cap.release()
                 raise
 
-    def process_motor1_frame(self, frame_idx, frame):
-        cam_cfg = CONFIG['cameras'][frame_idx]
+        self.restore_state()
+
+    def init_camera_state(self, cam_cfg):
+        """Appends the per-camera tracking, gating and display state for the next camera"""
+        self.frames_skipped.append(0)
+        self.trackers.append(Sort(max_age=20, min_hits=3, iou_threshold=0.3))
+        self.motion_gates.append(MotionGate(cam_cfg['conveyor']['coords'], CONFIG['motion_gate']))
+        self.motion_skipped.append(False)
+        self.belt_priors.append(BeltMotionPrior(cam_cfg['belt_motion'], CONFIG['tracking'])
+                                if CONFIG['tracking']['belt_prior'] and 'belt_motion' in cam_cfg else None)
+        self.last_detections.append((np.empty((0, 4), dtype=int), np.empty(0), np.empty(0, dtype=int),
+                                     np.empty(0, dtype=int)))
+        line_coords = cam_cfg['conveyor'].get('line_coords')
+        self.counters.append(LineCrossingCounter(line_coords, CONFIG['classes'],
+                                                 window=CONFIG['counting']['rate_window'],
+                                                 max_idle=CONFIG['counting']['max_idle_frames'])
+                             if line_coords else None)
+        self.tracked_objects.append(set())
+        self.camera_windows.append(cam_cfg['name'])
+        self.views.append(None)
+        self.frame_times.append(time.time())
+        self.stale.append(False)
+
+    def restore_state(self, trackers=True):
+        """
+        Resumes trackers and line counters from a recent snapshot. trackers=False when vision
+        workers own the trackers (they restore their own).
+        """
+        cfg = CONFIG['snapshot']
+        self.last_snapshot_time = time.time()
+        if not cfg['enabled'] or self.replay:
+            return
+        start = time.perf_counter()
+        parts = load_snapshot(cfg['path'], cfg['max_age'])
+        if parts is None:
+            return
+        for i, counter in enumerate(self.counters):
+            if trackers and f'tracker{i}' in parts:
+                self.trackers[i].restore(parts[f'tracker{i}'])
+            if counter and f'counter{i}' in parts:
+                counter.restore(parts[f'counter{i}'])
+        print(f"♻️ Restored tracker state from {cfg['path']} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def save_state(self, force=False):
+        """Writes a snapshot every CONFIG['snapshot']['interval'] seconds, or now if force"""
+        cfg = CONFIG['snapshot']
+        if not cfg['enabled'] or self.replay or self.last_snapshot_time is None:
+            return
+        now = time.time()
+        if not force and now - self.last_snapshot_time < cfg['interval']:
+            return
+        self.last_snapshot_time = now
+        parts = {}
+        for i, counter in enumerate(self.counters):
+            if not self.workers:
+                parts[f'tracker{i}'] = self.trackers[i].snapshot()
+            if counter:
+                parts[f'counter{i}'] = counter.snapshot()
+        try:
+            save_snapshot(cfg['path'], parts)
+        except OSError as e:
+            print(f"⚠️ Could not save track snapshot: {e}")
 
-        self.draw_conveyor_boundaries(frame, cam_cfg)
+    def process_motor1_frame(self, frame_idx, frame, result=None, tracks=None):
+        cam_cfg = CONFIG['cameras'][frame_idx]
         area_factor = cam_cfg['area_scale_factor']
 
-        detections, total_area = self.process_frame(frame, frame_idx)
+        detections, total_area = self.process_frame(frame, frame_idx, result)
         total_area = total_area*area_factor
-        tracker_results = self.trackers[frame_idx].update(detections)
-
-        for res in tracker_results:
-            x1, y1, x2, y2, obj_id = map(int, res)
-            if self.is_inside_conveyor(x1, y1, x2, y2, frame_idx) and obj_id not in self.tracked_objects[frame_idx]:
-                self.tracked_objects[frame_idx].append(obj_id)
-
-        counted_objects = len(self.tracked_objects[frame_idx])
-        speed_updated = self.speed_controller.update_motor1_speed(counted_objects, total_area)
+        prior = self.belt_priors[frame_idx]
+        if tracks is None and prior:
+            velocity = prior.velocity(self.controller.motor_speeds[prior.motor], time.time())
+            self.trackers[frame_idx].set_belt_velocity(velocity, prior.velocity_var)
+        if tracks is not None:
+            tracker_results = tracks  # already tracked in the camera's vision worker
+        elif self.motion_skipped[frame_idx]:
+            tracker_results = self.trackers[frame_idx].coast()
+        else:
+            tracker_results = self.trackers[frame_idx].update(detections)
+
+        counter = self.counters[frame_idx]
+        object_rate = None
+        if counter:
+            boxes, _, cls, _ = self.last_detections[frame_idx]
+            counter.update(tracker_results, boxes, cls)
+            counted_objects = counter.total
+            if CONFIG['counting']['rate_control']:
+                object_rate = counter.rate()
+        else:
+            # No counting line configured: count every track id seen on the conveyor
+            for res in tracker_results:
+                x1, y1, x2, y2, obj_id = map(int, res)
+                if self.is_inside_conveyor(x1, y1, x2, y2, frame_idx):
+                    self.tracked_objects[frame_idx].add(obj_id)
+            counted_objects = len(self.tracked_objects[frame_idx])
+        speed_updated = self.speed_controller.update_motor1_speed(counted_objects, total_area, object_rate)
         current_speed = self.speed_controller.get_motor1_speed()
         current_motor2_speed = self.controller.motor_speeds['motor2']
 
@@ -150,21 +301,18 @@ class UnifiedMotorSystem:
             self.controller.set_motor_speeds(current_speed, current_motor2_speed)
             self.send_to_dashboard(current_speed, counted_objects, total_area, cam_cfg['motor_class'])
 
-        # Show metrics
-        self.show_metrics(frame, total_area, current_speed, counted_objects, cam_cfg['name'])
+        self.publish_view(frame_idx, frame, self.last_detections[frame_idx], total_area, current_speed,
+                          counted_objects)
 
         return frame
 
-    def process_motor2_frame(self, frame_idx, frame):
+    def process_motor2_frame(self, frame_idx, frame, result=None):
         cam_cfg = CONFIG['cameras'][frame_idx]
         area_factor = cam_cfg['area_scale_factor']
-        self.draw_conveyor_boundaries(frame, cam_cfg)
-        detection_zone = self.get_detection_zone(frame, frame_idx)
-        top, bottom, left, right = detection_zone
-        cv2.rectangle(frame, (left, top), (right, bottom), CONFIG['visualization']['detection_zone_color'], 2)
         current_time = time.time()
         current_speed = cam_cfg['min_speed']
         total_area = 0
+        frame_detections = None
         if self.belt_active and current_time >= self.movement_end_time:
             self.belt_active = False
             current_speed = cam_cfg['min_speed']
@@ -174,7 +322,8 @@ class UnifiedMotorSystem:
 
         # Detect waste if belt is idle
         if not self.belt_active:
-            detections, total_area = self.process_frame(frame, frame_idx)
+            detections, total_area = self.process_frame(frame, frame_idx, result)
+            frame_detections = self.last_detections[frame_idx]
             total_area = total_area * area_factor
             if total_area > cam_cfg['threshold_area']:
                 self.belt_active = True
@@ -187,10 +336,9 @@ class UnifiedMotorSystem:
                 print(f"Waste detected! Moving belt for {movement_time:.2f} seconds at {current_speed}")
 
         if self.is_motor2_speed_changed != current_speed:
-            self.send_to_dashboard(current_speed, 0, total_area, cam_cfg['name'])
+            self.send_to_dashboard(current_speed, 0, total_area, cam_cfg['motor_class'])
             self.is_motor2_speed_changed = current_speed
-        # Show metrics
-        self.show_metrics(frame, total_area, current_speed, self.belt_active, cam_cfg['name'])
+        self.publish_view(frame_idx, frame, frame_detections, total_area, current_speed, self.belt_active)
 
         return frame
 
@@ -241,32 +389,102 @@ class UnifiedMotorSystem:
         coords = CONFIG['cameras'][frame_idx]['conveyor']['coords']
         return x1 >= coords[0] and x2 <= coords[2] and y1 >= coords[1] and y2 <= coords[3]
 
-    def process_frame(self, frame, frame_idx):
-        total_area = 0
-        detections = np.empty((0, 5))
-
-        results = self.models[frame_idx].predict(
-            source=frame,
-            stream=True,
-            conf=CONFIG['model']['conf_threshold']
-        )
-
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                if self.is_inside_conveyor(x1, y1, x2, y2, frame_idx):
-                    width, height = x2 - x1, y2 - y1
-                    area = math.floor((width * height) / 1820)
-                    total_area += area
+    def needs_detection(self, frame_idx):
+        """Pickup belt skips detection while it is still moving a detected load"""
+        if "pickup" in CONFIG['cameras'][frame_idx]['name'].lower():
+            return not (self.belt_active and time.time() < self.movement_end_time)
+        return True
+
+    def detect_batch(self, frames):
+        """
+        Runs one batched predict over the frames of every camera that needs detection.
+        Returns {frame_idx: Detections}; cameras not in the batch are absent, and cameras
+        whose belt has not changed (or that are between detect_every frames) are flagged in
+        self.motion_skipped.
+        """
+        batch = []
+        for i, frame in frames:
+            self.motion_skipped[i] = False
+            if not self.needs_detection(i):
+                continue
+            prior = self.belt_priors[i]
+            if (prior and not prior.should_infer()) or not self.motion_gates[i].should_infer(frame):
+                # Unchanged belt, or between detect_every frames: reuse detections and coast tracks
+                self.motion_skipped[i] = True
+                continue
+            batch.append((i, frame))
+        if not batch:
+            return {}
+
+        results = self.run_detector(batch)
+        return {i: result for (i, _), result in zip(batch, results)}
+
+    def run_detector(self, batch):
+        """Predicts on [(frame_idx, frame), ...], optionally on the conveyor crop only, in frame coordinates"""
+        if not CONFIG['model']['crop_to_conveyor']:
+            return self.model.predict([frame for _, frame in batch])
+
+        return predict_rois(self.model, [frame for _, frame in batch],
+                            [CONFIG['cameras'][i]['conveyor']['coords'] for i, _ in batch])
+
+    def process_frame(self, frame, frame_idx, result=None):
+        if self.motion_skipped[frame_idx]:
+            # No inference this frame, reuse the last detections
+            boxes, conf, cls, areas = self.last_detections[frame_idx]
+        else:
+            if result is None:
+                # Worker mode has no local model; the worker's next message carries detections
+                result = self.run_detector([(frame_idx, frame)])[0] if self.model else empty_detections()
+            boxes, conf, cls, areas = filter_detections(result, CONFIG['cameras'][frame_idx]['conveyor']['coords'],
+                                                        CONFIG['model']['max_detections'])
+            self.last_detections[frame_idx] = (boxes, conf, cls, areas)
+        total_area = int(areas.sum())
+        # SORT input: (N, 5) [x1, y1, x2, y2, score]
+        detections = np.column_stack([boxes, conf]).astype(float)
+        return detections, total_area
 
-                    # Draw detection
-                    self.draw_detection(frame, x1, y1, width, height,
-                                      box.conf[0].item(), int(box.cls[0].item()),
-                                      area, frame_idx)
+    def publish_view(self, frame_idx, frame, frame_detections, area, speed, active_or_objects):
+        """Records what render_view() draws; overlays are only built when something displays them"""
+        self.views[frame_idx] = {
+            'frame': frame,
+            'detections': frame_detections,
+            'area': area,
+            'speed': speed,
+            'status': active_or_objects,
+            'skip_ratio': self.skip_ratio(frame_idx),
+        }
 
-                    detections = np.vstack([detections, [x1, y1, x2, y2, box.conf[0].item()]])
+    def skip_ratio(self, frame_idx):
+        """Share of processed frames on which the motion gate skipped inference"""
+        if self.workers and self.workers.latest[frame_idx]:
+            return self.workers.latest[frame_idx]['skip_ratio']
+        return self.motion_gates[frame_idx].skip_ratio
+
+    def render_view(self, frame_idx, copy=False):
+        """Draws boundaries, detections and metrics for the camera's latest view"""
+        view = self.views[frame_idx]
+        if view is None:
+            return None
+        cam_cfg = CONFIG['cameras'][frame_idx]
+        frame = view['frame'].copy() if copy else view['frame']
 
-        return detections, total_area
+        self.draw_conveyor_boundaries(frame, cam_cfg)
+        line_coords = cam_cfg['conveyor'].get('line_coords')
+        if line_coords:
+            cv2.line(frame, tuple(line_coords[:2]), tuple(line_coords[2:]), CONFIG['visualization']['line_color'],
+                     CONFIG['visualization']['line_thickness'])
+        if "pickup" in cam_cfg['name'].lower():
+            top, bottom, left, right = self.get_detection_zone(frame, frame_idx)
+            cv2.rectangle(frame, (left, top), (right, bottom), CONFIG['visualization']['detection_zone_color'], 2)
+
+        if view['detections'] is not None:
+            boxes, conf, cls, areas = view['detections']
+            for (x1, y1, x2, y2), score, cls_id, area in zip(boxes.tolist(), conf.tolist(), cls.tolist(),
+                                                             areas.tolist()):
+                self.draw_detection(frame, x1, y1, x2 - x1, y2 - y1, score, cls_id, area, frame_idx)
+
+        self.show_metrics(frame, view['area'], view['speed'], view['status'], cam_cfg['name'], view['skip_ratio'])
+        return frame
 
     def draw_detection(self, frame, x1, y1, width, height, confidence, cls_id, area, frame_idx):
         cvzone.cornerRect(frame, (x1, y1, width, height), cv2.LINE_AA)
@@ -283,7 +501,7 @@ class UnifiedMotorSystem:
             scale=2, thickness=1, offset=5
         )
 
-    def show_metrics(self, frame, area, speed, active_or_objects, name):
+    def show_metrics(self, frame, area, speed, active_or_objects, name, skip_ratio=None):
 
         area = math.floor(area)
         if "pickup" in name.lower():
@@ -298,49 +516,148 @@ class UnifiedMotorSystem:
                           scale=2, thickness=1, offset=5)
         cvzone.putTextRect(frame, f'Speed: {speed}', (600, 50),
                           scale=2, thickness=1, offset=5)
+        if skip_ratio is not None:
+            cvzone.putTextRect(frame, f'Inference skipped: {skip_ratio:.0%}', (0, 100),
+                              scale=2, thickness=1, offset=5)
 
     def send_to_dashboard(self, speed, objects, area, motor_class):
-        data_store.add_data(speed, objects, area, motor_class)
+        self.data_store.add_data(speed, objects, area, motor_class)
 
     def send_load_to_dashboard(self, load_value):
         if load_value <= 0:
             return
         load_value = math.floor(load_value)
-        data_store.add_load_data( "type_one",load_value)
+        self.data_store.add_load_data( "type_one",load_value)
         print(f"Sent load to dashboard: {load_value:.2f}")
 
 
+    def open_windows(self):
+        display_cfg = CONFIG['display']
+        if display_cfg['mode'] == 'mjpeg':
+            self.renderer = MjpegRenderer(lambda i: self.render_view(i, copy=True), self.camera_windows,
+                                          max_fps=display_cfg['max_fps'], host=display_cfg['host'],
+                                          port=display_cfg['port'])
+            self.renderer.start()
+        elif display_cfg['mode'] == 'window':
+            for window in self.camera_windows:
+                cv2.namedWindow(window, cv2.WINDOW_NORMAL)
+                cv2.resizeWindow(window, 800, 600)
+
+    def display_frames(self, frames):
+        """Shows the processed frames in window mode; returns False once 'q' is pressed"""
+        if CONFIG['display']['mode'] != 'window':
+            return True
+        for i, _ in frames:
+            cv2.imshow(self.camera_windows[i], self.render_view(i))
+        return cv2.waitKey(1) & 0xFF != ord('q')
+
     def run(self):
+        if CONFIG['vision_workers']['enabled'] and not self.replay:
+            return self.run_workers()
+
         try:
             self.initialize_cameras()
+            self.open_windows()
 
-            for window in self.camera_windows:
-                cv2.namedWindow(window, cv2.WINDOW_NORMAL)
-                cv2.resizeWindow(window, 800, 600)
+            for grabber in self.grabbers:
+                grabber.start()
 
             while True:
+                seen = self.frame_signal.count
+                captured = self.read_frames()
+                if not captured:
+                    if self.replay and self.replay.finished():
+                        break
+                    if self.replay and not self.replay.realtime:
+                        continue  # synchronous grabbers read on demand, nothing would notify the signal
+                    # Wait once for any camera, so a stalled one never holds up the others
+                    self.frame_signal.wait(seen, CONFIG['capture']['read_timeout'])
+                    captured = self.read_frames()
+
+                results = self.detect_batch(captured)
+
                 frames = []
-                for i, cap in enumerate(self.caps):
-                    ret, frame = cap.read()
-                    if not ret:
+                for i, frame in captured:
+                    if "pickup" in CONFIG['cameras'][i]['name'].lower():
+                        frame = self.process_motor2_frame(i, frame, results.get(i))
+                    else:
+                        frame = self.process_motor1_frame(i, frame, results.get(i))
+
+                    frames.append((i, frame))
+
+                self.check_load_cell_value()
+                self.save_state()
+                if not self.display_frames(frames):
+                    break
+
+        except Exception as e:
+            print(f"❌ Error in main loop: {str(e)}")
+        finally:
+            self.cleanup()
+
+    def read_frames(self):
+        """
+        [(camera index, frame)] for every camera with a new frame, without waiting. A camera
+        without one for CONFIG['capture']['read_timeout'] seconds is reported once until it recovers.
+        """
+        captured = []
+        now = time.time()
+        for i, grabber in enumerate(self.grabbers):
+            # Always take the newest frame; anything older was overwritten and counted as skipped
+            frame, _, skipped = grabber.read_latest(timeout=0)
+            if frame is None:
+                if not self.stale[i] and now - self.frame_times[i] >= CONFIG['capture']['read_timeout']:
+                    self.stale[i] = True
+                    if grabber.connected:
+                        print(f"❌ Camera {i} delivered no frame for {now - self.frame_times[i]:.1f}s")
+                    else:
                         print(f"❌ Camera {i} disconnected")
-                        continue
+                continue
+            if self.stale[i]:
+                self.stale[i] = False
+                print(f"✅ Camera {i} delivering frames again")
+            self.frame_times[i] = now
+            self.frames_skipped[i] += skipped
+            captured.append((i, frame))
+        return captured
+
+    def run_workers(self):
+        """
+        Coordinator loop for vision worker mode: each camera is captured, detected and tracked in
+        its own process, this process only runs motor control, dashboard writes and display.
+        """
+        try:
+            print("🚀 Starting vision workers...")
+            for cam_cfg in CONFIG['cameras']:
+                self.init_camera_state(cam_cfg)
+            self.restore_state(trackers=False)
+            self.workers = VisionWorkerPool(CONFIG)
+            self.workers.start()
+            self.open_windows()
+
+            while True:
+                for i, cam_cfg in enumerate(CONFIG['cameras']):
+                    self.workers.set_detection(i, self.needs_detection(i))
+                    if 'belt_motion' in cam_cfg:
+                        self.workers.set_belt_speed(i, self.controller.motor_speeds[cam_cfg['belt_motion']['motor']])
 
-                    if CONFIG['cameras'][i]['flip']:
-                        frame = cv2.flip(frame, 1)
+                ready = self.workers.poll()
+                if not ready:
+                    time.sleep(0.002)
+                    continue
 
+                frames = []
+                for i, frame, message in ready:
+                    self.frames_skipped[i] = message['skipped']
                     if "pickup" in CONFIG['cameras'][i]['name'].lower():
-                        frame = self.process_motor2_frame(i, frame)
+                        frame = self.process_motor2_frame(i, frame, message['detections'])
                     else:
-                        frame = self.process_motor1_frame(i, frame)
-
+                        frame = self.process_motor1_frame(i, frame, message['detections'], message['tracks'])
                     frames.append((i, frame))
 
-                for i, frame in frames:
-                    cv2.imshow(self.camera_windows[i], frame)
                 self.check_load_cell_value()
-                # Check for quit key
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                self.save_state()
+                if not self.display_frames(frames):
                     break
 
         except Exception as e:
@@ -350,13 +667,34 @@ class UnifiedMotorSystem:
 
     def cleanup(self):
         print("🧹 Cleaning up resources...")
+        self.save_state(force=True)
+        for i, grabber in enumerate(self.grabbers):
+            grabber.stop()
+            print(f"📷 Camera {i}: captured {grabber.frames_captured} frames, skipped {self.frames_skipped[i]}, "
+                  f"inference skipped on {self.motion_gates[i].skip_ratio:.0%} of processed frames")
+        for i, counter in enumerate(self.counters):
+            if counter:
+                print(f"🔢 Camera {i}: {counter.total} objects crossed the line {counter.class_totals}")
+
+        if self.workers:
+            self.workers.stop()
+            for i, message in enumerate(self.workers.latest):
+                if message:
+                    print(f"📷 Camera {i}: skipped {message['skipped']} frames, "
+                          f"inference skipped on {message['skip_ratio']:.0%} of processed frames")
+
         for cap in self.caps:
             if cap is not None and cap.isOpened():
                 cap.release()
 
+        if self.renderer:
+            self.renderer.stop()
+
         self.controller.set_motor_speeds(0, 0)
         self.controller.close()
-        cv2.destroyAllWindows()
+        self.data_store.close()  # commits rows still queued for the writer thread
+        if CONFIG['display']['mode'] == 'window':
+            cv2.destroyAllWindows()
         print("✅ Cleanup complete")
 
 
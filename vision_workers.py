@@ -0,0 +1,267 @@
+import queue
+import time
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of frames in shared memory, written by one worker and read by the coordinator.
+
+    Each slot carries the sequence number of the frame in it. The writer clears it before copying
+    and stamps it afterwards, so a reader can tell when a slot was overwritten under it.
+    """
+
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = name is None
+        header_bytes = slots * np.dtype(np.int64).itemsize
+        if self.owner:
+            size = header_bytes + slots * int(np.prod(self.shape))
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if self.owner:
+            self.seqs[:] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame, seq):
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        self.frames[slot] = frame
+        self.seqs[slot] = seq
+
+    def read(self, seq):
+        """Returns a copy of frame seq, or None if it has already been overwritten"""
+        slot = seq % self.slots
+        if self.seqs[slot] != seq:
+            return None
+        frame = self.frames[slot].copy()
+        if self.seqs[slot] != seq:
+            return None
+        return frame
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        del self.seqs, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _put_latest(results, item, attempts=3):
+    """
+    Puts item on a full results queue by dropping the oldest message: the queue holds as many
+    messages as the ring has slots, so the oldest one points at the slot the frame just went into
+    """
+    for _ in range(attempts):
+        try:
+            results.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                results.get_nowait()
+            except queue.Empty:
+                pass  # still in the queue's feeder thread, try again
+
+
+def camera_worker(frame_idx, config, results, stop_event, detect_enabled, belt_speed):
+    """
+    Process entry point running capture, motion gating, inference and tracking for one camera.
+    Frames go into a SharedFrameRing; only compact per-frame results are put on the results queue.
+    belt_speed is the coordinator's current motor speed for cameras with a belt motion prior.
+    """
+    import cv2
+    from detectors import Detections, create_detector, filter_detections, predict_rois
+    from frame_grabber import CameraCaptureThread, open_camera
+    from motion_gate import BeltMotionPrior, MotionGate
+    from sort import Sort
+    from track_snapshot import camera_snapshot_path, load_snapshot, save_snapshot
+
+    cam_cfg = config['cameras'][frame_idx]
+    coords = cam_cfg['conveyor']['coords']
+    read_timeout = config['capture']['read_timeout']
+    snapshot_cfg = config['snapshot']
+    snapshot_path = camera_snapshot_path(snapshot_cfg['path'], frame_idx)
+    grabber = None
+    ring = None
+    tracker = None
+    try:
+        cap = open_camera(cam_cfg)
+        if not cap.isOpened():
+            raise RuntimeError(f"Camera {frame_idx} failed to open")
+        grabber = CameraCaptureThread(cap, cam_cfg['name'], flip=cam_cfg['flip'])
+        detector = create_detector(config['model'])
+        gate = MotionGate(coords, config['motion_gate'])
+        # Only the segregation belt counts objects; the pickup belt works on area alone
+        tracker = None if "pickup" in cam_cfg['name'].lower() else Sort(max_age=20, min_hits=3, iou_threshold=0.3)
+        prior = None
+        if tracker and config['tracking']['belt_prior'] and 'belt_motion' in cam_cfg:
+            prior = BeltMotionPrior(cam_cfg['belt_motion'], config['tracking'])
+        if tracker and snapshot_cfg['enabled']:
+            parts = load_snapshot(snapshot_path, snapshot_cfg['max_age'])
+            if parts and 'tracker' in parts:
+                tracker.restore(parts['tracker'])
+        last_snapshot_time = time.time()
+        grabber.start()
+
+        frame = None
+        while frame is None and not stop_event.is_set():
+            frame, _, _ = grabber.read_latest(timeout=read_timeout)
+        if frame is None:
+            return
+        ring = SharedFrameRing(frame.shape, config['vision_workers']['ring_slots'])
+        results.put(('ready', frame_idx, ring.name, frame.shape))
+
+        no_detections = Detections(np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                                   np.empty(0, dtype=int))
+        detections = no_detections
+        seq = 0
+        skipped_total = 0
+        while not stop_event.is_set():
+            frame, timestamp, skipped = grabber.read_latest(timeout=read_timeout)
+            if frame is None:
+                if not grabber.connected:
+                    results.put(('disconnected', frame_idx, None, None))
+                continue
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (ring.shape[1], ring.shape[0]))
+            skipped_total += skipped
+
+            tracks = None
+            if prior:
+                tracker.set_belt_velocity(prior.velocity(belt_speed.value, timestamp), prior.velocity_var)
+            if not detect_enabled.value:
+                # Coordinator paused detection (pickup belt moving), don't replay stale boxes afterwards
+                detections = no_detections
+                if tracker:
+                    tracks = tracker.coast()
+            elif (not prior or prior.should_infer()) and gate.should_infer(frame):
+                if config['model']['crop_to_conveyor']:
+                    result = predict_rois(detector, [frame], [coords])[0]
+                else:
+                    result = detector.predict([frame])[0]
+                boxes, conf, cls, _ = filter_detections(result, coords, config['model']['max_detections'])
+                detections = Detections(boxes.astype(np.float32), conf, cls)
+                if tracker:
+                    tracks = tracker.update(np.column_stack([boxes, conf]).astype(float))
+            elif tracker:
+                # Unchanged belt or between detect_every frames: keep the last detections and coast the tracks
+                tracks = tracker.coast()
+
+            seq += 1
+            ring.write(frame, seq)
+            message = {
+                'seq': seq,
+                'timestamp': timestamp,
+                'skipped': skipped_total,
+                'skip_ratio': gate.skip_ratio,
+                'detections': detections,
+                'tracks': tracks,
+            }
+            _put_latest(results, ('frame', frame_idx, message, None))
+
+            if tracker and snapshot_cfg['enabled'] and time.time() - last_snapshot_time >= snapshot_cfg['interval']:
+                last_snapshot_time = time.time()
+                save_snapshot(snapshot_path, {'tracker': tracker.snapshot()})
+
+    except Exception as e:
+        results.put(('error', frame_idx, str(e), None))
+    finally:
+        if tracker and snapshot_cfg['enabled']:
+            try:
+                save_snapshot(snapshot_path, {'tracker': tracker.snapshot()})
+            except OSError:
+                pass
+        if grabber:
+            grabber.stop()
+            grabber.cap.release()
+        if ring:
+            ring.close()
+
+
+class VisionWorkerPool:
+    """Starts one camera_worker process per camera and collects their latest results"""
+
+    def __init__(self, config):
+        self.config = config
+        self.ctx = mp.get_context('spawn')
+        self.stop_event = self.ctx.Event()
+        self.processes = []
+        self.queues = []
+        self.detect_enabled = []
+        self.belt_speeds = []
+        self.rings = []
+        self.latest = []
+
+    def start(self, ready_timeout=120):
+        queue_size = self.config['vision_workers']['ring_slots']
+        for i in range(len(self.config['cameras'])):
+            results = self.ctx.Queue(maxsize=queue_size)
+            detect_enabled = self.ctx.Value('b', 1)
+            belt_speed = self.ctx.Value('d', 0.0)
+            process = self.ctx.Process(target=camera_worker, name=f"vision-worker-{i}", daemon=True,
+                                       args=(i, self.config, results, self.stop_event, detect_enabled, belt_speed))
+            process.start()
+            self.processes.append(process)
+            self.queues.append(results)
+            self.detect_enabled.append(detect_enabled)
+            self.belt_speeds.append(belt_speed)
+            self.latest.append(None)
+
+        for i, results in enumerate(self.queues):
+            kind, _, payload, shape = results.get(timeout=ready_timeout)
+            if kind != 'ready':
+                raise RuntimeError(f"Vision worker {i} failed: {payload}")
+            self.rings.append(SharedFrameRing(shape, self.config['vision_workers']['ring_slots'], name=payload))
+            print(f"✅ Vision worker {i} ({self.config['cameras'][i]['name']}) ready")
+
+    def set_detection(self, frame_idx, enabled):
+        self.detect_enabled[frame_idx].value = 1 if enabled else 0
+
+    def set_belt_speed(self, frame_idx, speed):
+        self.belt_speeds[frame_idx].value = speed
+
+    def poll(self):
+        """
+        Drains every worker queue and returns [(frame_idx, frame, message), ...] for the newest
+        frame of each camera that produced one. Older results are dropped, like LatestFrameBuffer.
+        """
+        ready = []
+        for i, results in enumerate(self.queues):
+            newest = None
+            while True:
+                try:
+                    kind, _, payload, _ = results.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'error':
+                    raise RuntimeError(f"Vision worker {i} failed: {payload}")
+                if kind == 'disconnected':
+                    print(f"❌ Camera {i} disconnected")
+                    continue
+                newest = payload
+            if newest is None:
+                continue
+            frame = self.rings[i].read(newest['seq'])
+            if frame is None:
+                continue
+            self.latest[i] = newest
+            ready.append((i, frame, newest))
+        return ready
+
+    def stop(self):
+        self.stop_event.set()
+        for ring in self.rings:
+            ring.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
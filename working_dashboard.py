@@ -4,6 +4,11 @@ import plotly.express as px
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import datetime
+import os
+import tempfile
+from urllib.parse import urlencode
+import flask
+from data_export import csv_chunks, write_excel
 from shared_data import DataStore
 
 
@@ -53,8 +58,11 @@ app.layout = html.Div(
                 html.H3(children="Dashboard", className="lContent"),
                 html.Div(children=[
                     dcc.Dropdown(options=["csv", "Excel"], value="csv", id="file_format", className="fileDropDown"),
-                    html.Button(children="Download Full Data", n_clicks=0, className="successBtn", id="download_data_btn"),
-                    dcc.Download(id="download_data_frame")
+                    dcc.Dropdown(options=["seg_belt", "pickup_belt"], placeholder="All belts", id="export_belt",
+                                 className="fileDropDown"),
+                    dcc.DatePickerRange(id="export_range"),
+                    html.A(html.Button(children="Download Data", n_clicks=0, className="successBtn",
+                                       id="download_data_btn"), id="download_link", href="/export/csv"),
                 ], className="navbarBtnsGrp"),
 
             ], className="navbar"
@@ -75,6 +83,7 @@ app.layout = html.Div(
                 ], className="load")
                 ], className="loadContainer"),
         dcc.Interval(id='update_interval', interval=1000, n_intervals=0),
+        dcc.Store(id='live_cursor'),
         html.Div([
                 html.P(["Live Graph Of Seg_Belt"], className="lContent"),
                 dcc.Graph(id='live_graph_seg_container',
@@ -106,31 +115,52 @@ app.layout = html.Div(
 )
 
 
+LIVE_BELTS = ['seg_belt', 'pickup_belt']
+LIVE_GRAPH_OPTIONS = ['Speed', 'Area', 'Objects']
+
+
 @app.callback(
     Output("live_graph_seg_container", "figure"),
         Output("live_graph_pickup_container", "figure"),
+        Output("live_graph_seg_container", "extendData"),
+        Output("live_graph_pickup_container", "extendData"),
+        Output("live_cursor", "data"),
         Output("load_status", 'children'),
         Output("motor_1_speed", 'children'),
         Output("motor_2_speed", 'children'),
-    Input('update_interval', 'n_intervals')
+    Input('update_interval', 'n_intervals'),
+    State('live_cursor', 'data'),
 )
-def update_live_graph(n_intervals):
-    startDate = endDate = None
-    seg_belt_df = store.get_selected_data(startDate, endDate, 'seg_belt')
-    pickup_belt_df = store.get_selected_data(startDate, endDate, 'pickup_belt')
-    print("updated",n_intervals)
-    seg_belt_graph_options = ['Speed', 'Area', 'Objects']
-    pickup_belt_graph_options = ['Speed', 'Area', 'Objects']
-    seg_fig = getAllGraphs(seg_belt_graph_options, seg_belt_df, False)
-    pickup_fig = getAllGraphs(pickup_belt_graph_options, pickup_belt_df, False )
+def update_live_graph(n_intervals, cursor):
+    # The browser keeps today's points; each tick only sends the rows added after this client's
+    # cursor. The figures are rebuilt from the day's rows on the first tick and at midnight.
+    today = datetime.date.today().isoformat()
+    if not cursor or cursor['day'] != today:
+        cursor = {'day': today}
+        figures, extends = [], [dash.no_update] * len(LIVE_BELTS)
+        start_id = store.last_row_id()
+        for belt in LIVE_BELTS:
+            rows = store.get_rows_since(belt)
+            cursor[belt] = max(start_id, int(rows['id'][-1])) if len(rows['id']) else start_id
+            figures.append(getAllGraphs(LIVE_GRAPH_OPTIONS, rows, False))
+    else:
+        figures, extends = [dash.no_update] * len(LIVE_BELTS), []
+        for belt in LIVE_BELTS:
+            rows = store.get_rows_since(belt, cursor[belt])
+            if not len(rows['id']):
+                extends.append(dash.no_update)
+                continue
+            cursor[belt] = int(rows['id'][-1])
+            extends.append((dict(x=[rows['time_stamp']] * len(LIVE_GRAPH_OPTIONS),
+                                 y=[rows[name.lower()].tolist() for name in LIVE_GRAPH_OPTIONS]),
+                            list(range(len(LIVE_GRAPH_OPTIONS)))))
     last_load = store.get_last_load()
     last_speed_motor_one = store.get_last_row('seg_belt')['speed']
     last_speed_motor_two = store.get_last_row('pickup_belt')['speed']
-    print("last load",last_speed_motor_one, last_speed_motor_two)
     last_load_value = 250
     if(last_load.size != 0):
         last_load_value = last_load['weight']
-    return seg_fig, pickup_fig, last_load_value, last_speed_motor_one, last_speed_motor_two
+    return (*figures, *extends, cursor, last_load_value, last_speed_motor_one, last_speed_motor_two)
 
 @app.callback(
     Output('graph_container', 'figure'),
@@ -150,20 +180,36 @@ def update_graph(click, graphsSelector, startDate, endDate, grpBy):
     return fig
 
 @app.callback(
-Output('download_data_frame', 'data'),
-    Input('download_data_btn', 'n_clicks'),
-    State("file_format", 'value'),
-    prevent_initial_call=True
+    Output('download_link', 'href'),
+    Input('file_format', 'value'),
+    Input('export_belt', 'value'),
+    Input('export_range', 'start_date'),
+    Input('export_range', 'end_date'),
 )
-
-
-def download_data(downloadClick,formatOption):
-    currDate = datetime.date.today()
-    df = store.get_all_data()
-    if formatOption == 'csv':
-        return dcc.send_data_frame(df.to_csv, f"data_downloaded_{currDate}.csv")
-    elif formatOption == 'Excel':
-        return dcc.send_data_frame(df.to_excel, f"data_downloaded_{currDate}.xlsx", sheet_name="Sheet_name_1")
+def update_download_link(formatOption, belt, startDate, endDate):
+    params = {name: value for name, value in (('belt', belt), ('start', startDate), ('end', endDate)) if value}
+    return f"/export/{'xlsx' if formatOption == 'Excel' else 'csv'}?{urlencode(params)}"
+
+
+@app.server.route('/export/<fmt>')
+def download_data(fmt):
+    # Plain Flask route instead of dcc.Download, which would carry the whole file in the callback
+    # response: CSV is streamed as it is read, Excel is built in a temporary file and sent from disk
+    args = flask.request.args
+    belt, startDate, endDate = args.get('belt'), args.get('start'), args.get('end')
+    filename = f"data_downloaded_{belt or 'all'}_{startDate or 'start'}_{endDate or datetime.date.today()}"
+    if fmt == 'csv':
+        return flask.Response(flask.stream_with_context(csv_chunks(store, 'storeHouse', startDate, endDate, belt)),
+                              mimetype='text/csv',
+                              headers={'Content-Disposition': f'attachment; filename="{filename}.csv"'})
+    if fmt == 'xlsx':
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        write_excel(path, store, 'storeHouse', startDate, endDate, belt)
+        response = flask.send_file(path, as_attachment=True, download_name=f"{filename}.xlsx")
+        response.call_on_close(lambda: os.remove(path))
+        return response
+    flask.abort(404)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file